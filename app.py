@@ -1,108 +1,214 @@
-from flask import Flask, jsonify, request
-from flasgger import Swagger
+from flask import Flask, jsonify, request, g
 from routes.stats_routes import stats_api
 from routes.admin_routes import admin_api
 from routes.auth_routes import auth_api  # Cambié auth_api por auth_routes
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 from config import config
+from utils.sql_loader import configure_result_cache, configure_queries
+from utils.user_cache import configure_user_cache
+from utils.token_blocklist import create_blocklist
+from utils.snapshot import configure_snapshot
+from utils.player_stats_store import configure_player_stats_store
+from utils.http_cache import configure_http_cache
+from utils.name_index import configure_name_index
+from utils.health import configure_health, health_checker
+from utils.swagger_loader import document_views
+from utils.logging_setup import setup_logging, log_access
+from utils.instrumentation import install_db_timing, metrics, TimedJSONProvider, server_timing_header
+from db import ASYNC_DATABASE_URL, configure_engine
+from sqlalchemy.engine import Engine
 import logging
 import os;
+import time
 from datetime import timedelta
 
-# ====================================
-# CONFIGURACIÓN DE LOGGING
-# ====================================
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
 # ====================================
-# CREAR APLICACIÓN FLASK
+# CREAR APLICACIÓN FLASK (FACTORY)
 # ====================================
-app = Flask(__name__)
+def create_app(config_name=None):
+    """
+    Crea y configura una aplicación. config_name es una clave de config.py
+    ('development', 'production', 'testing'); por defecto se usa FLASK_ENV
+    """
+    app = Flask(__name__)
+    app.json = TimedJSONProvider(app)  # orjson si está instalado, y mide la serialización (Server-Timing)
 
-# ====================================
-# CARGAR CONFIGURACIÓN
-# ====================================
-env = os.environ.get('FLASK_ENV', 'default') # Cambiar por el entorno correspondiente
-app.config.from_object(config[env])
+    # ====================================
+    # CARGAR CONFIGURACIÓN
+    # ====================================
+    config_name = config_name or os.environ.get('FLASK_ENV', 'default') # Cambiar por el entorno correspondiente
+    app.config.from_object(config[config_name])
+
+    configure_services(app)
+
+    # ====================================
+    # CONFIGURACIÓN DE CORS
+    # ====================================
+    # IMPORTANTE: En producción, especifica los orígenes permitidos
+    CORS(app,
+         origins=app.config['CORS_ORIGINS'],  # Vite usa 5173, CRA usa 3000
+         methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+         allow_headers=["Content-Type", "Authorization"],
+         supports_credentials=True
+    )
+
+    configure_jwt(app)
+
+    if app.config['SWAGGER_ENABLED']:
+        # flasgger (jsonschema, mistune, plantillas) solo se importa si hace falta
+        from flasgger import Swagger
+        # Guardado para poder generar /apispec.json antes del fork (utils/prefork)
+        app.extensions['swagger'] = Swagger(app, config=swagger_config, template=swagger_template)
+
+    register_error_handlers(app)
+    register_request_hooks(app)
+
+    # ====================================
+    # REGISTRAR BLUEPRINTS
+    # ====================================
+    app.add_url_rule('/health', 'health_check', health_check, methods=['GET'])
+    app.add_url_rule('/health/live', 'health_live', health_live, methods=['GET'])
+    app.add_url_rule('/health/ready', 'health_ready', health_ready, methods=['GET'])
+    app.register_blueprint(stats_api, url_prefix="/api/stats")
+    app.register_blueprint(admin_api, url_prefix="/api/admin")
+    app.register_blueprint(auth_api, url_prefix="/api/auth")
+    if app.config['STATS_ASYNC_ENABLED']:
+        from routes.stats_async_routes import stats_async_api
+        app.register_blueprint(stats_async_api, url_prefix="/api/stats/async")
+    if app.config['SWAGGER_ENABLED']:
+        # Specs de swagger/global.yaml en las vistas registradas (utils/swagger_loader)
+        document_views(app)
+
+    return app
 
 # ====================================
-# CONFIGURACIÓN DE CORS
+# CONFIGURACIÓN DE LOGGING Y SERVICIOS
 # ====================================
-# IMPORTANTE: En producción, especifica los orígenes permitidos
-CORS(app, 
-     origins=app.config['CORS_ORIGINS'],  # Vite usa 5173, CRA usa 3000
-     methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-     allow_headers=["Content-Type", "Authorization"],
-     supports_credentials=True
-)
+def configure_services(app):
+    """
+    Logging, caches y engines según la configuración de la app. Son del
+    proceso: si se crean varias apps, manda la última
+    """
+    # Los logs se encolan y un hilo aparte los formatea y escribe (utils/logging_setup)
+    setup_logging(app.config['LOG_LEVEL'])
+    # En la clase Engine: cuenta también los engines que se creen después
+    # (el principal se crea en la primera consulta, ver db.py)
+    install_db_timing(Engine)
+    # Pool del engine principal según la configuración de esta app
+    configure_engine(app.config)
+
+    # Registro de queries nombradas (scripts/sql) y cache de resultados (utils/sql_loader)
+    configure_queries(hot_reload=app.config['SQL_HOT_RELOAD'])
+    configure_result_cache(
+        max_entries=app.config['RESULT_CACHE_MAX_ENTRIES'],
+        enabled=app.config['RESULT_CACHE_ENABLED']
+    )
+    configure_user_cache(
+        ttl=app.config['USER_CACHE_TTL'],
+        negative_ttl=app.config['USER_CACHE_NEGATIVE_TTL'],
+        max_entries=app.config['USER_CACHE_MAX_ENTRIES']
+    )
+    configure_name_index(ttl=app.config['NAME_INDEX_TTL'])
+    # Sondas de /health/ready: un hilo comprueba las dependencias y guarda el resultado
+    configure_health(
+        interval=app.config['HEALTH_CHECK_INTERVAL'],
+        timeout=app.config['HEALTH_DB_TIMEOUT'],
+        pool_saturation=app.config['HEALTH_POOL_SATURATION']
+    )
+
+    # Modo snapshot: las estadísticas se leen de un fichero SQLite local (utils/snapshot)
+    configure_snapshot(app.config['STATS_SNAPSHOT_PATH'])
+    # Estadísticas de partidos terminados en ficheros mmap compartidos por los workers
+    configure_player_stats_store(app.config['PLAYER_STATS_STORE_PATH'])
+    # Cuerpos comprimidos de las respuestas GET cacheables (utils/http_cache)
+    configure_http_cache(max_entries=app.config['COMPRESSION_CACHE_MAX_ENTRIES'])
+    # Engine async (asyncpg) de las vistas de /api/stats/async, con su propio bucle de eventos
+    if app.config['STATS_ASYNC_ENABLED']:
+        from utils.async_query_exec import configure_async_engine
+        configure_async_engine(
+            ASYNC_DATABASE_URL,
+            pool_size=app.config['DB_POOL_SIZE'],
+            max_overflow=app.config['DB_MAX_OVERFLOW'],
+            pool_timeout=app.config['DB_POOL_TIMEOUT'],
+            pool_recycle=app.config['DB_POOL_RECYCLE'],
+            pool_pre_ping=app.config['DB_POOL_PRE_PING']
+        )
 
 # ====================================
 # CONFIGURACIÓN JWT
 # ====================================
+def configure_jwt(app):
+    # Inicializar JWT Manager
+    jwt = JWTManager(app)
 
-# Inicializar JWT Manager
-jwt = JWTManager(app)
+    # Tokens revocados en logout (utils/token_blocklist)
+    app.extensions['token_blocklist'] = create_blocklist(app.config)
 
-# ====================================
-# MANEJADORES DE ERRORES JWT
-# ====================================
-@jwt.expired_token_loader
-def expired_token_callback(jwt_header, jwt_payload):
-    """
-    Función que se ejecuta cuando un token ha expirado
-    """
-    logger.warning("Token expirado detectado")
-    return jsonify({
-        'msg': 'Token ha expirado',
-        'error': 'token_expired'
-    }), 401
+    @jwt.token_in_blocklist_loader
+    def check_if_token_revoked(jwt_header, jwt_payload):
+        """
+        Función que se ejecuta en cada petición con token: consulta en memoria, sin BD
+        """
+        return app.extensions['token_blocklist'].is_revoked(jwt_payload['jti'])
 
-@jwt.invalid_token_loader
-def invalid_token_callback(error):
-    """
-    Función que se ejecuta cuando un token es inválido
-    """
-    logger.warning(f"Token inválido: {error}")
-    return jsonify({
-        'msg': 'Token inválido',
-        'error': 'invalid_token'
-    }), 401
+    # ====================================
+    # MANEJADORES DE ERRORES JWT
+    # ====================================
+    @jwt.expired_token_loader
+    def expired_token_callback(jwt_header, jwt_payload):
+        """
+        Función que se ejecuta cuando un token ha expirado
+        """
+        logger.warning("Token expirado detectado")
+        return jsonify({
+            'msg': 'Token ha expirado',
+            'error': 'token_expired'
+        }), 401
 
-@jwt.unauthorized_loader
-def missing_token_callback(error):
-    """
-    Función que se ejecuta cuando no se proporciona token
-    """
-    logger.warning("Token faltante en petición protegida")
-    return jsonify({
-        'msg': 'Token de autorización requerido',
-        'error': 'authorization_required'
-    }), 401
+    @jwt.invalid_token_loader
+    def invalid_token_callback(error):
+        """
+        Función que se ejecuta cuando un token es inválido
+        """
+        logger.warning(f"Token inválido: {error}")
+        return jsonify({
+            'msg': 'Token inválido',
+            'error': 'invalid_token'
+        }), 401
 
-@jwt.needs_fresh_token_loader
-def token_not_fresh_callback(jwt_header, jwt_payload):
-    """
-    Función que se ejecuta cuando se necesita un token "fresco"
-    """
-    return jsonify({
-        'msg': 'Token fresco requerido',
-        'error': 'fresh_token_required'
-    }), 401
+    @jwt.unauthorized_loader
+    def missing_token_callback(error):
+        """
+        Función que se ejecuta cuando no se proporciona token
+        """
+        logger.warning("Token faltante en petición protegida")
+        return jsonify({
+            'msg': 'Token de autorización requerido',
+            'error': 'authorization_required'
+        }), 401
 
-@jwt.revoked_token_loader
-def revoked_token_callback(jwt_header, jwt_payload):
-    """
-    Función que se ejecuta cuando un token ha sido revocado
-    """
-    return jsonify({
-        'msg': 'Token ha sido revocado',
-        'error': 'token_revoked'
-    }), 401
+    @jwt.needs_fresh_token_loader
+    def token_not_fresh_callback(jwt_header, jwt_payload):
+        """
+        Función que se ejecuta cuando se necesita un token "fresco"
+        """
+        return jsonify({
+            'msg': 'Token fresco requerido',
+            'error': 'fresh_token_required'
+        }), 401
+
+    @jwt.revoked_token_loader
+    def revoked_token_callback(jwt_header, jwt_payload):
+        """
+        Función que se ejecuta cuando un token ha sido revocado
+        """
+        return jsonify({
+            'msg': 'Token ha sido revocado',
+            'error': 'token_revoked'
+        }), 401
 
 # ====================================
 # CONFIGURACIÓN DE SWAGGER
@@ -147,64 +253,98 @@ swagger_template = {
     ]
 }
 
-swagger = Swagger(app, config=swagger_config, template=swagger_template)
-
 # ====================================
 # MANEJADORES DE ERRORES GLOBALES
 # ====================================
-@app.errorhandler(404)
-def not_found(error):
-    """
-    Manejador para errores 404 (No encontrado)
-    """
-    return jsonify({
-        'error': 'Endpoint no encontrado',
-        'message': 'La ruta solicitada no existe'
-    }), 404
+def register_error_handlers(app):
+    @app.errorhandler(404)
+    def not_found(error):
+        """
+        Manejador para errores 404 (No encontrado)
+        """
+        return jsonify({
+            'error': 'Endpoint no encontrado',
+            'message': 'La ruta solicitada no existe'
+        }), 404
 
-@app.errorhandler(500)
-def internal_error(error):
-    """
-    Manejador para errores 500 (Error interno del servidor)
-    """
-    logger.error(f"Error interno del servidor: {error}")
-    return jsonify({
-        'error': 'Error interno del servidor',
-        'message': 'Ha ocurrido un error inesperado'
-    }), 500
+    @app.errorhandler(500)
+    def internal_error(error):
+        """
+        Manejador para errores 500 (Error interno del servidor)
+        """
+        logger.error(f"Error interno del servidor: {error}")
+        return jsonify({
+            'error': 'Error interno del servidor',
+            'message': 'Ha ocurrido un error inesperado'
+        }), 500
 
-@app.errorhandler(400)
-def bad_request(error):
-    """
-    Manejador para errores 400 (Petición incorrecta)
-    """
-    return jsonify({
-        'error': 'Petición incorrecta',
-        'message': 'Los datos enviados no son válidos'
-    }), 400
+    @app.errorhandler(400)
+    def bad_request(error):
+        """
+        Manejador para errores 400 (Petición incorrecta)
+        """
+        return jsonify({
+            'error': 'Petición incorrecta',
+            'message': 'Los datos enviados no son válidos'
+        }), 400
 
 # ====================================
 # MIDDLEWARE PARA LOGGING DE REQUESTS
 # ====================================
-@app.before_request
-def log_request_info():
-    """
-    Log de todas las peticiones recibidas
-    """
-    logger.info(f"Request: {request.method} {request.url}")
+def register_request_hooks(app):
+    @app.before_request
+    def log_request_info():
+        """
+        Marca el inicio de la petición para el registro de acceso
+        """
+        g.request_start = time.perf_counter()
 
-@app.after_request
-def log_response_info(response):
-    """
-    Log de todas las respuestas enviadas
-    """
-    logger.info(f"Response: {response.status_code}")
-    return response
+    @app.after_request
+    def log_response_info(response):
+        """
+        Un registro JSON por petición (método, ruta, estado, duración y tiempo en BD),
+        latencia por ruta en las métricas y cabecera Server-Timing
+        """
+        start = g.get('request_start')
+        if start is None:
+            return response
+
+        method, path, remote_addr = request.method, request.path, request.remote_addr
+        route = request.url_rule.rule if request.url_rule else None
+        request_g = g._get_current_object()
+
+        def record():
+            duration = time.perf_counter() - start
+            metrics.observe_request(method, route, response.status_code, duration)
+            log_access(
+                method,
+                route,
+                path,
+                response.status_code,
+                duration,
+                request_g.get('db_time', 0.0),
+                request_g.get('db_queries', 0),
+                remote_addr,
+                sample_rate=app.config['ACCESS_LOG_SAMPLE_RATE']
+            )
+            return duration
+
+        if response.is_streamed:
+            # El cuerpo (y sus consultas) se genera después de este hook: se
+            # registra al cerrar la respuesta, sin cabecera Server-Timing
+            response.call_on_close(record)
+            return response
+
+        duration = record()
+        if app.config['SERVER_TIMING_ENABLED']:
+            response.headers['Server-Timing'] = server_timing_header(
+                request_g.get('db_time', 0.0), g.get('serialize_time', 0.0), duration
+            )
+        return response
 
 # ====================================
 # RUTA DE SALUD (HEALTH CHECK)
 # ====================================
-@app.route('/health', methods=['GET'])
 def health_check():
     """
     Endpoint para verificar que la API está funcionando
@@ -215,23 +355,36 @@ def health_check():
         'version': '1.0.0'
     }), 200
 
-# ====================================
-# REGISTRAR BLUEPRINTS
-# ====================================
-app.register_blueprint(stats_api, url_prefix="/api/stats")
-app.register_blueprint(admin_api, url_prefix="/api/admin")
-app.register_blueprint(auth_api, url_prefix="/api/auth")
+def health_live():
+    """
+    Liveness: el proceso responde. No toca la BD, así un fallo de la BD no
+    hace que se reinicien los workers
+    """
+    return jsonify({'status': 'alive'}), 200
+
+def health_ready():
+    """
+    Readiness: último resultado del hilo de comprobaciones (utils/health).
+    No consulta nada, responde aunque el pool esté agotado; 503 "starting"
+    hasta que termina la primera comprobación
+    """
+    ready, report = health_checker.status()
+    return jsonify(report), 200 if ready else 503
 
 # ====================================
 # ARRANCAR LA APLICACIÓN
 # ====================================
+# Solo para desarrollo (servidor de Werkzeug, un proceso). En producción,
+# varios workers con gunicorn: gunicorn -c gunicorn.conf.py (ver wsgi.py)
 if __name__ == "__main__":
+    app = create_app()
     logger.info("Iniciando servidor Flask...")
     logger.info(f"CORS configurado para orígenes: http://localhost:3000, http://localhost:5173")
-    logger.info("Swagger UI disponible en: http://localhost:5000/apidocs/")
-    
+    if app.config['SWAGGER_ENABLED']:
+        logger.info("Swagger UI disponible en: http://localhost:5000/apidocs/")
+
     app.run(
         debug=app.config['DEBUG'],
         host='0.0.0.0',  # Permitir conexiones desde cualquier IP
         port=5000
-    )
\ No newline at end of file
+    )
@@ -0,0 +1,101 @@
+"""
+Startup-time budget of the app entry point.
+
+Imports the entry point (wsgi by default, which also runs create_app) in fresh
+interpreters under `python -X importtime`, and fails when the median total is
+over the budget or when a module that must load lazily (numpy, flasgger...)
+is imported at startup. Prints the slowest modules to show where time goes.
+
+Usage:
+    python -m benchmarks.import_budget
+    python -m benchmarks.import_budget --budget-ms 400 --runs 7 --top 20
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+# Median import time of the entry point, in ms (IMPORT_TIME_BUDGET_MS)
+DEFAULT_BUDGET_MS = float(os.environ.get('IMPORT_TIME_BUDGET_MS', 600))
+
+# Loaded on first use only: numpy with the player stats store, flasgger when
+# Swagger UI is enabled, asyncpg with the async stats views
+LAZY_MODULES = ('numpy', 'pandas', 'flasgger', 'yaml', 'asyncpg', 'sqlalchemy.ext.asyncio')
+
+_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$')
+
+def import_times(module, env):
+    """
+    Import module once in a new interpreter
+    Returns:
+        list: (name, self_us, cumulative_us, depth) per imported module, in import order
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f"import {module}"],
+        env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+    modules = []
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            modules.append((name, int(self_us), int(cumulative_us), len(indent) // 2))
+    return modules
+
+def main():
+    parser = argparse.ArgumentParser(description="Fail when importing the app entry point is over budget")
+    parser.add_argument('--module', default='wsgi', help="Entry point to import (default wsgi)")
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS,
+                        help=f"Maximum median import time (default {DEFAULT_BUDGET_MS:g}, IMPORT_TIME_BUDGET_MS)")
+    parser.add_argument('--runs', type=int, default=5, help="Interpreters started (after one warm-up run)")
+    parser.add_argument('--top', type=int, default=15, help="Slowest modules listed")
+    parser.add_argument('--allow', default='', help="Comma separated modules allowed at startup anyway")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.setdefault('FLASK_ENV', 'production')
+
+    # The first run compiles the .pyc files
+    import_times(args.module, env)
+    runs = [import_times(args.module, env) for _ in range(args.runs)]
+
+    totals_ms = []
+    for modules in runs:
+        total = next(cumulative for name, _, cumulative, _ in modules if name == args.module)
+        totals_ms.append(total / 1000)
+    median_ms = statistics.median(totals_ms)
+
+    # Per module self time, median over the runs
+    self_ms = {}
+    for modules in runs:
+        for name, self_us, _, _ in modules:
+            self_ms.setdefault(name, []).append(self_us / 1000)
+    slowest = sorted(((statistics.median(times), name) for name, times in self_ms.items()), reverse=True)
+
+    print(f"import {args.module}: median {median_ms:.1f} ms over {args.runs} runs "
+          f"(min {min(totals_ms):.1f}, max {max(totals_ms):.1f}), budget {args.budget_ms:g} ms")
+    print("Slowest modules (self time):")
+    for elapsed, name in slowest[:args.top]:
+        print(f"  {elapsed:8.2f} ms  {name}")
+
+    allowed = {name.strip() for name in args.allow.split(',') if name.strip()}
+    loaded = {name for name, _, _, _ in runs[0]}
+    eager = [name for name in LAZY_MODULES if name in loaded and name not in allowed]
+
+    failed = False
+    if eager:
+        print(f"FAIL: imported at startup but meant to load lazily: {', '.join(eager)}", file=sys.stderr)
+        failed = True
+    if median_ms > args.budget_ms:
+        print(f"FAIL: import {args.module} takes {median_ms:.1f} ms, budget {args.budget_ms:g} ms", file=sys.stderr)
+        failed = True
+    if failed:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
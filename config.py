@@ -38,6 +38,110 @@ class Config:
     # Aquí puedes añadir tu configuración de BD si la necesitas
     DATABASE_URL = os.environ.get('DATABASE_URL') or 'sqlite:///app.db'
     
+    # Pool de conexiones del engine (db.py)
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+    DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 30))     # Segundos esperando una conexión libre
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))     # Segundos antes de renovar una conexión
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', 'true').lower() == 'true'
+    
+    # ====================================
+    # CACHE DE RESULTADOS DE CONSULTAS
+    # ====================================
+    # Resultados de las queries con "-- ttl:" en scripts/sql (ver utils/sql_loader)
+    RESULT_CACHE_ENABLED = os.environ.get('RESULT_CACHE_ENABLED', 'true').lower() == 'true'
+    RESULT_CACHE_MAX_ENTRIES = int(os.environ.get('RESULT_CACHE_MAX_ENTRIES', 1024))
+    
+    # Recargar scripts/sql cuando cambian los ficheros (solo desarrollo)
+    SQL_HOT_RELOAD = os.environ.get('SQL_HOT_RELOAD', 'false').lower() == 'true'
+    
+    # ====================================
+    # CONFIGURACIÓN DE ESTADÍSTICAS
+    # ====================================
+    # Máximo de partidos por petición en /api/stats/by-game/batch
+    STATS_BATCH_MAX_GAMES = int(os.environ.get('STATS_BATCH_MAX_GAMES', 30))
+    # Vistas async en /api/stats/async (asyncpg): las consultas independientes de una
+    # petición se lanzan a la vez. El pool async usa los mismos DB_POOL_*
+    STATS_ASYNC_ENABLED = os.environ.get('STATS_ASYNC_ENABLED', 'false').lower() == 'true'
+    # Partidos por consulta en /api/stats/async/by-game/batch (los trozos van en paralelo)
+    STATS_ASYNC_BATCH_CHUNK = int(os.environ.get('STATS_ASYNC_BATCH_CHUNK', 10))
+    # Filas leídas por viaje al servidor en /api/stats/by-date-range
+    STATS_STREAM_CHUNK_SIZE = int(os.environ.get('STATS_STREAM_CHUNK_SIZE', 500))
+    # Caché HTTP de GET /games/<id> y /dates/<fecha>: un partido es final tantas horas
+    # después de empezar; final => max-age largo, en juego => corto
+    STATS_GAME_FINAL_AFTER_HOURS = float(os.environ.get('STATS_GAME_FINAL_AFTER_HOURS', 6))
+    STATS_FINAL_MAX_AGE = int(os.environ.get('STATS_FINAL_MAX_AGE', 86400))
+    STATS_LIVE_MAX_AGE = int(os.environ.get('STATS_LIVE_MAX_AGE', 30))
+    # Respuestas cacheables de al menos este tamaño (bytes) se comprimen (br/gzip)
+    COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))
+    COMPRESSION_CACHE_MAX_ENTRIES = int(os.environ.get('COMPRESSION_CACHE_MAX_ENTRIES', 256))
+    # Fichero SQLite exportado con "python -m utils.snapshot <fichero>": si se indica,
+    # /api/stats/* lee de él en lugar de la BD principal (ver utils/snapshot)
+    STATS_SNAPSHOT_PATH = os.environ.get('STATS_SNAPSHOT_PATH') or None
+    # Directorio del almacén columnar de estadísticas de jugadores (utils/player_stats_store):
+    # si se indica, /by-game sirve de él los partidos ya terminados
+    PLAYER_STATS_STORE_PATH = os.environ.get('PLAYER_STATS_STORE_PATH') or None
+    
+    # ====================================
+    # CACHE DE USUARIOS (utils/user_cache)
+    # ====================================
+    # /verify y /refresh leen nba.dim_users como mucho una vez por TTL y usuario
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 10))
+    USER_CACHE_NEGATIVE_TTL = int(os.environ.get('USER_CACHE_NEGATIVE_TTL', 5))  # Emails desconocidos
+    USER_CACHE_MAX_ENTRIES = int(os.environ.get('USER_CACHE_MAX_ENTRIES', 10000))
+    
+    # ====================================
+    # TRADE TOOL (routes/admin_routes)
+    # ====================================
+    # El trade tool resuelve nombres de equipos y jugadores en memoria (utils/name_index);
+    # el índice se reconstruye desde la BD cada NAME_INDEX_TTL segundos
+    NAME_INDEX_TTL = int(os.environ.get('NAME_INDEX_TTL', 300))
+    # Máximo de traspasos por petición en /api/admin/trade-tool/bulk
+    TRADE_BULK_MAX_TRADES = int(os.environ.get('TRADE_BULK_MAX_TRADES', 100))
+    
+    # ====================================
+    # SONDAS DE SALUD (utils/health)
+    # ====================================
+    # /health/ready devuelve el último resultado de un hilo que comprueba cada
+    # HEALTH_CHECK_INTERVAL segundos la BD, la ocupación del pool y el registro de queries
+    HEALTH_CHECK_INTERVAL = float(os.environ.get('HEALTH_CHECK_INTERVAL', 5))
+    HEALTH_DB_TIMEOUT = float(os.environ.get('HEALTH_DB_TIMEOUT', 2))  # Conexión y SELECT 1, en segundos
+    # Fracción de conexiones del pool en uso a partir de la cual el worker no está listo
+    HEALTH_POOL_SATURATION = float(os.environ.get('HEALTH_POOL_SATURATION', 0.9))
+    
+    # ====================================
+    # TOKENS REVOCADOS (utils/token_blocklist)
+    # ====================================
+    # 'memory': solo este proceso
+    # 'sqlite': fichero compartido, cada worker lo sincroniza cada SYNC_INTERVAL segundos
+    TOKEN_BLOCKLIST_BACKEND = os.environ.get('TOKEN_BLOCKLIST_BACKEND', 'memory')
+    TOKEN_BLOCKLIST_SQLITE_PATH = os.environ.get('TOKEN_BLOCKLIST_SQLITE_PATH', '/tmp/flask_api_revoked_tokens.db')
+    TOKEN_BLOCKLIST_SYNC_INTERVAL = float(os.environ.get('TOKEN_BLOCKLIST_SYNC_INTERVAL', 1))
+    
+    # ====================================
+    # RATE LIMITING (middleware/security.py)
+    # ====================================
+    # 'memory': contadores por proceso
+    # 'sqlite': fichero compartido por todos los workers del host
+    RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'memory')
+    RATE_LIMIT_SQLITE_PATH = os.environ.get('RATE_LIMIT_SQLITE_PATH', '/tmp/flask_api_rate_limit.db')
+    RATE_LIMIT_MAX_KEYS = int(os.environ.get('RATE_LIMIT_MAX_KEYS', 10000))
+    
+    # ====================================
+    # CONFIGURACIÓN DE SWAGGER
+    # ====================================
+    # Sin Swagger UI no se carga swagger/global.yaml ni se registra flasgger
+    SWAGGER_ENABLED = os.environ.get('SWAGGER_ENABLED', 'true').lower() == 'true'
+    
+    # ====================================
+    # CONFIGURACIÓN DE LOGGING
+    # ====================================
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+    # Fracción de respuestas 2xx que generan registro de acceso (los errores siempre)
+    ACCESS_LOG_SAMPLE_RATE = float(os.environ.get('ACCESS_LOG_SAMPLE_RATE', 1.0))
+    # Cabecera Server-Timing (db, serialize, total) en cada respuesta
+    SERVER_TIMING_ENABLED = os.environ.get('SERVER_TIMING_ENABLED', 'true').lower() == 'true'
+    
     # ====================================
     # CONFIGURACIÓN DE CORS
     # ====================================
@@ -54,7 +158,7 @@ class Config:
     # ====================================
     # CONFIGURACIÓN DE DESARROLLO
     # ====================================
-    DEBUG = True  # Cambiar a False en producción
+    DEBUG = False  # Solo DevelopmentConfig lo activa
     TESTING = False
 
 class ProductionConfig(Config):
@@ -68,10 +172,25 @@ class ProductionConfig(Config):
     SECRET_KEY = os.environ.get('SECRET_KEY')
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY')
     
+    # Solo una muestra de las peticiones correctas
+    ACCESS_LOG_SAMPLE_RATE = float(os.environ.get('ACCESS_LOG_SAMPLE_RATE', 0.1))
+    
+    # Varios workers por host: límite y tokens revocados compartidos
+    RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'sqlite')
+    TOKEN_BLOCKLIST_BACKEND = os.environ.get('TOKEN_BLOCKLIST_BACKEND', 'sqlite')
+    
+    # Documentación desactivada salvo que se pida explícitamente
+    SWAGGER_ENABLED = os.environ.get('SWAGGER_ENABLED', 'false').lower() == 'true'
+    
     # Orígenes CORS más restrictivos
     CORS_ORIGINS = [
         'https://tu-dominio-frontend.com'
     ]
+    
+    # Pool más grande y timeout corto para no encolar peticiones
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 20))
+    DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 5))
 
 class DevelopmentConfig(Config):
     """
@@ -79,6 +198,8 @@ class DevelopmentConfig(Config):
     """
     DEBUG = True
     TESTING = False
+    
+    SQL_HOT_RELOAD = os.environ.get('SQL_HOT_RELOAD', 'true').lower() == 'true'
 
 class TestingConfig(Config):
     """
@@ -89,6 +210,9 @@ class TestingConfig(Config):
     
     # Token de duración más corta para tests
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(minutes=5)
+    
+    # Sin ping previo: los tests no pierden conexiones
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', 'false').lower() == 'true'
 
 # ====================================
 # SELECTOR DE CONFIGURACIÓN
@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine
+import threading
 from dotenv import load_dotenv
 import os
 
@@ -11,5 +11,56 @@ PG_HOST = os.getenv("PG_HOST")
 PG_PORT = os.getenv("PG_PORT")
 
 DATABASE_URL = f"postgresql://{PG_USER}:{PG_PASSWORD}@{PG_HOST}:{PG_PORT}/{PG_DBNAME}"
+# Same database through asyncpg, for the async stats views (utils/async_query_exec)
+ASYNC_DATABASE_URL = f"postgresql+asyncpg://{PG_USER}:{PG_PASSWORD}@{PG_HOST}:{PG_PORT}/{PG_DBNAME}"
 
-engine = create_engine(DATABASE_URL)
\ No newline at end of file
+# Pool settings (DB_POOL_* in config.py), set by configure_engine. Scripts
+# that never create an app get SQLAlchemy's defaults
+_pool_options = {}
+
+_engine = None
+_engine_lock = threading.Lock()
+
+def configure_engine(app_config):
+    """
+    Apply the DB_POOL_* settings of the app's config. An engine built with
+    other settings is disposed and rebuilt on next use
+    """
+    global _engine, _pool_options
+
+    options = {
+        'pool_size': app_config['DB_POOL_SIZE'],
+        'max_overflow': app_config['DB_MAX_OVERFLOW'],
+        'pool_timeout': app_config['DB_POOL_TIMEOUT'],
+        'pool_recycle': app_config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': app_config['DB_POOL_PRE_PING']
+    }
+    with _engine_lock:
+        if options != _pool_options and _engine is not None:
+            _engine.dispose()
+            _engine = None
+        _pool_options = options
+
+def get_engine():
+    """
+    The application engine, created on first use: importing db does not load
+    the psycopg2 dialect nor build the pool
+    """
+    global _engine
+
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                from sqlalchemy import create_engine
+                from utils.pool_stats import InstrumentedQueuePool, install_pool_events
+
+                engine = create_engine(DATABASE_URL, poolclass=InstrumentedQueuePool, **_pool_options)
+                install_pool_events(engine)
+                _engine = engine
+    return _engine
+
+def __getattr__(name):
+    # `from db import engine` keeps working (scripts and CLIs), creating it then
+    if name == 'engine':
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,36 @@
+import multiprocessing
+import os
+
+# ====================================
+# SERVIDOR DE PRODUCCIÓN (gunicorn -c gunicorn.conf.py)
+# ====================================
+# Configuración de producción salvo que se indique otra (la lee create_app en wsgi.py)
+os.environ.setdefault('FLASK_ENV', 'production')
+
+wsgi_app = 'wsgi:app'
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+
+# Un proceso por worker: el rendimiento escala con los núcleos.
+# Cada worker tiene su pool: hasta workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) conexiones
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+
+# La app se crea una vez en el proceso maestro, antes del fork
+preload_app = True
+
+def when_ready(server):
+    """
+    Antes de lanzar los workers: estado de solo lectura compartido (utils/prefork)
+    """
+    from wsgi import app
+    from utils.prefork import preload_shared_state
+    preload_shared_state(app)
+
+def post_fork(server, worker):
+    """
+    En cada worker, antes de aceptar peticiones: abre las conexiones del pool
+    """
+    from wsgi import app
+    from utils.prefork import warm_up_worker
+    warm_up_worker(app)
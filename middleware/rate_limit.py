@@ -0,0 +1,173 @@
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# ====================================
+# SLIDING WINDOW COUNTER
+# ====================================
+# Cada clave guarda solo el contador de la ventana actual y el de la anterior.
+# Las peticiones de la ventana anterior se ponderan por la parte de ella que
+# aún cae dentro de los últimos `per_seconds`: O(1) en CPU y memoria por clave.
+
+def _estimate(current, previous, window_start, per_seconds, now):
+    elapsed = (now - window_start) / per_seconds
+    return previous * (1 - elapsed) + current
+
+def _slide(window, current, previous, now_window):
+    """
+    Mueve los contadores a la ventana actual
+    Returns:
+        tuple: (current, previous) para now_window
+    """
+    if now_window == window:
+        return current, previous
+    if now_window == window + 1:
+        return 0, current
+    return 0, 0
+
+def _retry_after(current, previous, window_start, per_seconds, max_requests, now):
+    # Segundos hasta que el peso de la ventana anterior baje lo suficiente
+    if previous == 0:
+        return max(window_start + per_seconds - now, 0)
+    needed = (previous + current - max_requests + 1) / previous
+    return max(min(window_start + needed * per_seconds - now, window_start + per_seconds - now), 0)
+
+class MemoryBackend:
+    """
+    Contadores en memoria del proceso. Las claves sin actividad durante dos
+    ventanas se eliminan, y nunca hay más de max_keys (se expulsa la menos usada)
+    """
+
+    def __init__(self, max_keys=10000):
+        self.max_keys = max_keys
+        self._entries = OrderedDict()  # key -> [window, current, previous, expires_at]
+        self._lock = threading.Lock()
+
+    def hit(self, key, max_requests, per_seconds):
+        """
+        Registra una petición si está dentro del límite
+        Returns:
+            tuple: (permitida, segundos hasta poder reintentar)
+        """
+        now = time.time()
+        now_window = int(now // per_seconds)
+        window_start = now_window * per_seconds
+
+        with self._lock:
+            self._evict(now)
+
+            window, current, previous, _ = self._entries.get(key, (now_window, 0, 0, 0))
+            current, previous = _slide(window, current, previous, now_window)
+
+            if _estimate(current, previous, window_start, per_seconds, now) >= max_requests:
+                self._entries[key] = [now_window, current, previous, now + 2 * per_seconds]
+                self._entries.move_to_end(key)
+                return False, _retry_after(current, previous, window_start, per_seconds, max_requests, now)
+
+            self._entries[key] = [now_window, current + 1, previous, now + 2 * per_seconds]
+            self._entries.move_to_end(key)
+            return True, 0
+
+    def _evict(self, now):
+        # Las claves menos usadas están al principio
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if entry[3] > now and len(self._entries) < self.max_keys:
+                break
+            del self._entries[key]
+
+    def __len__(self):
+        return len(self._entries)
+
+class SQLiteBackend:
+    """
+    Contadores en un fichero SQLite compartido por todos los workers del host,
+    de modo que el límite es global y no por proceso
+    """
+
+    CLEANUP_INTERVAL = 60  # Segundos entre borrados de claves inactivas
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._last_cleanup = 0.0
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limit ("
+                " key TEXT PRIMARY KEY,"
+                " window INTEGER NOT NULL,"
+                " current INTEGER NOT NULL,"
+                " previous INTEGER NOT NULL,"
+                " expires_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS rate_limit_expires ON rate_limit (expires_at)")
+
+    def _connection(self):
+        # Una conexión por hilo y por proceso (los workers hacen fork)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def hit(self, key, max_requests, per_seconds):
+        """
+        Registra una petición si está dentro del límite
+        Returns:
+            tuple: (permitida, segundos hasta poder reintentar)
+        """
+        now = time.time()
+        now_window = int(now // per_seconds)
+        window_start = now_window * per_seconds
+        conn = self._connection()
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT window, current, previous FROM rate_limit WHERE key = ?", (key,)
+            ).fetchone()
+            window, current, previous = row or (now_window, 0, 0)
+            current, previous = _slide(window, current, previous, now_window)
+
+            allowed = _estimate(current, previous, window_start, per_seconds, now) < max_requests
+            if allowed:
+                current += 1
+
+            conn.execute(
+                "INSERT OR REPLACE INTO rate_limit (key, window, current, previous, expires_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, now_window, current, previous, now + 2 * per_seconds)
+            )
+
+            if now - self._last_cleanup > self.CLEANUP_INTERVAL:
+                self._last_cleanup = now
+                conn.execute("DELETE FROM rate_limit WHERE expires_at < ?", (now,))
+
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        if allowed:
+            return True, 0
+        return False, _retry_after(current, previous, window_start, per_seconds, max_requests, now)
+
+def create_backend(app_config):
+    """
+    Crea el backend indicado en RATE_LIMIT_BACKEND ('memory' o 'sqlite')
+    """
+    backend = app_config['RATE_LIMIT_BACKEND']
+    if backend == 'memory':
+        return MemoryBackend(max_keys=app_config['RATE_LIMIT_MAX_KEYS'])
+    if backend == 'sqlite':
+        return SQLiteBackend(app_config['RATE_LIMIT_SQLITE_PATH'])
+    raise ValueError(f"RATE_LIMIT_BACKEND desconocido: {backend}")
+
+def retry_after_header(seconds):
+    return str(max(int(math.ceil(seconds)), 1))
@@ -1,49 +1,75 @@
 from functools import wraps
 from flask import request, jsonify, current_app
-from flask_jwt_extended import get_jwt, get_jwt_identity
+from flask_jwt_extended import get_jwt, get_jwt_identity, verify_jwt_in_request
+from middleware.rate_limit import create_backend, retry_after_header
 import logging
 import time
-from collections import defaultdict
 
 logger = logging.getLogger(__name__)
 
 # ====================================
-# RATE LIMITING SIMPLE
+# RATE LIMITING
 # ====================================
-# Diccionario para guardar intentos por IP
-request_counts = defaultdict(list)
+def get_client_ip():
+    return request.environ.get('HTTP_X_REAL_IP', request.remote_addr)
 
-def rate_limit(max_requests=10, per_seconds=60):
+def get_client_identity():
     """
-    Decorador para limitar el número de peticiones por IP
+    Identidad del JWT si la petición trae uno válido, si no la IP
+    """
+    try:
+        verify_jwt_in_request(optional=True)
+        identity = get_jwt_identity()
+    except Exception:
+        identity = None
+    return f"user:{identity}" if identity else f"ip:{get_client_ip()}"
+
+RATE_LIMIT_KEYS = {
+    'ip': lambda: f"ip:{get_client_ip()}",
+    'identity': get_client_identity,
+}
+
+def get_rate_limit_backend():
+    """
+    Backend de la app actual (RATE_LIMIT_BACKEND), creado en el primer uso
+    """
+    backend = current_app.extensions.get('rate_limit')
+    if backend is None:
+        backend = current_app.extensions['rate_limit'] = create_backend(current_app.config)
+    return backend
+
+def rate_limit(max_requests=10, per_seconds=60, key='ip'):
+    """
+    Decorador para limitar el número de peticiones por cliente
     
     Args:
         max_requests: Número máximo de peticiones
         per_seconds: En cuántos segundos
+        key: 'ip', 'identity' (usuario del JWT, o IP si no hay token)
+             o una función que devuelva la clave
     """
+    key_func = RATE_LIMIT_KEYS[key] if isinstance(key, str) else key
+
     def decorator(f):
+        # Cada endpoint tiene sus propios contadores
+        scope = f"{f.__module__}.{f.__name__}"
+
         @wraps(f)
         def decorated_function(*args, **kwargs):
-            # Obtener IP del cliente
-            client_ip = request.environ.get('HTTP_X_REAL_IP', request.remote_addr)
-            current_time = time.time()
-            
-            # Limpiar peticiones antiguas
-            request_counts[client_ip] = [
-                req_time for req_time in request_counts[client_ip] 
-                if current_time - req_time < per_seconds
-            ]
+            client_key = key_func()
+            allowed, retry_after = get_rate_limit_backend().hit(
+                f"{scope}:{client_key}", max_requests, per_seconds
+            )
             
             # Verificar límite
-            if len(request_counts[client_ip]) >= max_requests:
-                logger.warning(f"Rate limit excedido para IP: {client_ip}")
-                return jsonify({
+            if not allowed:
+                logger.warning(f"Rate limit excedido para: {client_key}")
+                response = jsonify({
                     'error': 'Demasiadas peticiones',
                     'message': f'Máximo {max_requests} peticiones por {per_seconds} segundos'
-                }), 429
-            
-            # Registrar petición actual
-            request_counts[client_ip].append(current_time)
+                })
+                response.headers['Retry-After'] = retry_after_header(retry_after)
+                return response, 429
             
             return f(*args, **kwargs)
         return decorated_function
@@ -108,7 +134,7 @@ def log_security_event(event_type, details=None):
         event_type: Tipo de evento ('login_attempt', 'token_expired', etc.)
         details: Detalles adicionales
     """
-    client_ip = request.environ.get('HTTP_X_REAL_IP', request.remote_addr)
+    client_ip = get_client_ip()
     user_agent = request.headers.get('User-Agent', 'Unknown')
     
     log_data = {
@@ -130,7 +156,7 @@ def log_security_event(event_type, details=None):
 from middleware.security import rate_limit, require_role, validate_request_headers, log_security_event
 
 @auth_api.route("/login", methods=["POST"])
-@rate_limit(max_requests=5, per_seconds=300)  # 5 intentos por 5 minutos
+@rate_limit(max_requests=5, per_seconds=300)  # 5 intentos por 5 minutos y por IP
 @validate_request_headers
 def login():
     # tu código de login...
@@ -139,6 +165,7 @@ def login():
 
 @auth_api.route("/admin-only", methods=["GET"])
 @jwt_required()
+@rate_limit(max_requests=100, per_seconds=60, key='identity')  # Por usuario
 @require_role('admin')
 def admin_endpoint():
     # Solo usuarios con rol 'admin' pueden acceder
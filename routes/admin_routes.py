@@ -1,63 +1,189 @@
-from flask import Blueprint, request, jsonify
-from db import engine
-import pandas as pd
-from sqlalchemy import text
+from flask import Blueprint, request, jsonify, Response, current_app
+from db import get_engine
 import logging
-from utils.sql_loader import get_query
+from utils.sql_loader import get_statement, require_queries, invalidate_query_tables
+from utils.name_index import name_resolver, NameResolutionError, AmbiguousNameError, UnknownNameError
 from utils.swagger_loader import swagger_doc
+from utils.pool_stats import pool_stats
+from utils.instrumentation import metrics
+from middleware.security import require_role
+from flask_jwt_extended import jwt_required
 
 admin_api = Blueprint("admin_api", __name__)
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+require_queries('get_teams', 'get_players', 'lock_player_team', 'lock_players_team', 'update_player_id', 'insert_market_transaction')
+
 @admin_api.route("/trade-tool", methods=["POST"])
 @swagger_doc('trade_tool')
 def trade_tool():
   # Get JSON data from request body
-  data = request.get_json()
+  data = request.get_json(silent=True) or {}
   player_name = data.get("player_name")
   old_team_name = data.get("old_team_name")
   new_team_name = data.get("new_team_name")
 
-  query_team = get_query('get_team_id')
-  logger.info(f"Getting teams id ...")
-  old_team_id = int(pd.read_sql(text(query_team), engine, params={"name": old_team_name})['id'].iloc[0])
-  new_team_id = int(pd.read_sql(text(query_team), engine, params={"name": new_team_name})['id'].iloc[0])
-
-  logger.info(f"Getting player id ...")
-  query_player = get_query('get_player_id')
-  player_id = int(pd.read_sql(text(query_player), engine, params={"name": player_name, 'team_id': old_team_id})['id'].iloc[0])
+  if not player_name or not old_team_name or not new_team_name:
+    return jsonify({"error": "Missing required fields"}), 400
 
-  if player_id:
-      logger.info(f"Updating player id and inserting market transaction ...")
-      query_update = get_query('update_player_id')
-      query_insert = get_query('insert_market_transaction')
+  # Teams and player are resolved in memory (exact, alias, substring, then fuzzy)
+  try:
+    player_id, old_team_id, new_team_id = name_resolver.resolve_trade(player_name, old_team_name, new_team_name)
+  except AmbiguousNameError as e:
+    return jsonify({
+        "msg": str(e),
+        "error": "ambiguous_name",
+        "kind": e.kind,
+        "name": e.name,
+        "candidates": e.candidates
+    }), 400
+  except UnknownNameError as e:
+    logger.info("No %s found for %s", e.kind, e.name)
+    return jsonify({
+        "msg": f"No {e.kind} found",
+        "kind": e.kind,
+        "name": e.name
+    }), 404
 
-      with engine.begin() as conn:
-        update_result = conn.execute(text(query_update), {"new_team_id": new_team_id, "player_id": player_id})
-        logger.info(f"Updated {update_result.rowcount} rows")
-    
-        insert_result = conn.execute(text(query_insert), {"player_id": player_id, "old_team_id": old_team_id, "new_team_id": new_team_id})
-        logger.info(f"Inserted {insert_result.rowcount} rows into market_control")
+  logger.debug("Updating player id and inserting market transaction ...")
 
+  with get_engine().begin() as conn:
+    # The index may be stale (trade made by another worker): check under a row lock
+    current_team_id = conn.execute(get_statement('lock_player_team'), {"player_id": player_id}).scalar()
+    if current_team_id != old_team_id:
+      name_resolver.invalidate()
+      logger.info("Player %s is no longer in team %s", player_id, old_team_id)
       return jsonify({
-          "msg": 'Updated done succesfully',
+          "msg": 'Player is no longer in the old team',
           "player_id": player_id,
-          "player_name": player_name,
-          "old_team_name":old_team_name,
-          "old_team_id": old_team_id,
-          "new_team_name":new_team_name,
-          "new_team_id": new_team_id
-      })
-  
-  else:
-      logger.info(f"No player found for {player_name} in team {old_team_id}")
-      return jsonify({
-          "msg": 'No player found',
-      })
+          "old_team_id": old_team_id
+      }), 409
+
+    update_result = conn.execute(get_statement('update_player_id'), {"new_team_id": new_team_id, "player_id": player_id})
+    logger.info("Updated %s rows", update_result.rowcount)
+
+    insert_result = conn.execute(get_statement('insert_market_transaction'), {"player_id": player_id, "old_team_id": old_team_id, "new_team_id": new_team_id})
+    logger.info("Inserted %s rows into market_control", insert_result.rowcount)
+
+  # Drop cached results that read the tables we just wrote
+  invalidate_query_tables('update_player_id')
+  invalidate_query_tables('insert_market_transaction')
+  name_resolver.move_player(player_id, new_team_id)
+
+  return jsonify({
+      "msg": 'Updated done succesfully',
+      "player_id": player_id,
+      "player_name": player_name,
+      "old_team_name":old_team_name,
+      "old_team_id": old_team_id,
+      "new_team_name":new_team_name,
+      "new_team_id": new_team_id
+  })
+
+def name_error(e):
+  return {
+      "error": "ambiguous_name" if isinstance(e, AmbiguousNameError) else "unknown_name",
+      "kind": e.kind,
+      "name": e.name,
+      "candidates": e.candidates
+  }
+
+@admin_api.route("/trade-tool/bulk", methods=["POST"])
+@jwt_required()
+@require_role('admin')
+@swagger_doc('trade_tool_bulk')
+def trade_tool_bulk():
+  """
+  Several trades in one transaction: all of them are applied, or none
+  """
+  data = request.get_json(silent=True) or {}
+  trades = data.get("trades")
+  max_trades = current_app.config['TRADE_BULK_MAX_TRADES']
+
+  if not isinstance(trades, list) or not trades:
+    return jsonify({"error": "trades must be a non-empty list"}), 400
+  if len(trades) > max_trades:
+    return jsonify({"error": f"Max {max_trades} trades per batch"}), 400
+
+  fields = ("player_name", "old_team_name", "new_team_name")
+  if not all(isinstance(trade, dict) and all(trade.get(field) for field in fields) for trade in trades):
+    return jsonify({"error": "Missing required fields"}), 400
+
+  # Every name resolved against the same build of the index
+  resolved = name_resolver.resolve_trades([tuple(trade[field] for field in fields) for trade in trades])
+
+  results = []
+  for trade, result in zip(trades, resolved):
+    if isinstance(result, NameResolutionError):
+      results.append({**trade, **name_error(result)})
+    else:
+      player_id, old_team_id, new_team_id = result
+      results.append({**trade, "player_id": player_id, "old_team_id": old_team_id, "new_team_id": new_team_id})
+
+  player_ids = [result["player_id"] for result in results if "player_id" in result]
+  for result in results:
+    if "player_id" in result and player_ids.count(result["player_id"]) > 1:
+      result["error"] = "duplicate_player"
+
+  if any("error" in result for result in results):
+    return jsonify({"msg": 'No trades applied', "trades": results}), 400
+
+  moves = [
+      {"player_id": result["player_id"], "old_team_id": result["old_team_id"], "new_team_id": result["new_team_id"]}
+      for result in results
+  ]
+
+  with get_engine().begin() as conn:
+    # Lock every player first (in id order), then check none moved since the index was built
+    rows = conn.execute(get_statement('lock_players_team'), {"player_ids": player_ids})
+    current_teams = {row.id: row.team_id for row in rows}
+
+    conflicts = False
+    for result in results:
+      if current_teams.get(result["player_id"]) != result["old_team_id"]:
+        result["error"] = "player_not_in_old_team"
+        conflicts = True
+
+    if not conflicts:
+      # One executemany per statement
+      update_result = conn.execute(get_statement('update_player_id'), moves)
+      logger.info("Updated %s rows", update_result.rowcount)
+
+      insert_result = conn.execute(get_statement('insert_market_transaction'), moves)
+      logger.info("Inserted %s rows into market_control", insert_result.rowcount)
+
+  if conflicts:
+    name_resolver.invalidate()
+    return jsonify({"msg": 'No trades applied', "trades": results}), 409
+
+  invalidate_query_tables('update_player_id')
+  invalidate_query_tables('insert_market_transaction')
+  for move in moves:
+    name_resolver.move_player(move["player_id"], move["new_team_id"])
 
+  return jsonify({
+      "msg": 'Updated done succesfully',
+      "count": len(results),
+      "trades": results
+  })
 
-  
-        
+@admin_api.route("/pool-stats", methods=["GET"])
+@jwt_required()
+@require_role('admin')
+@swagger_doc('pool_stats')
+def get_pool_stats():
+  """
+  Connection pool counters: checkout wait, connections in use, overflow, timeouts
+  """
+  return jsonify(pool_stats.snapshot(get_engine().pool))
 
+@admin_api.route("/metrics", methods=["GET"])
+@jwt_required()
+@require_role('admin')
+@swagger_doc('metrics')
+def get_metrics():
+  """
+  Request and named query latency histograms in Prometheus text format
+  """
+  return Response(metrics.render_prometheus(), mimetype="text/plain; version=0.0.4")
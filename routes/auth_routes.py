@@ -1,20 +1,20 @@
 # auth_routes.py
-from flask import Blueprint, request, jsonify, make_response
-from db import engine
-import pandas as pd
-from sqlalchemy import text
+from flask import Blueprint, request, jsonify, make_response, current_app
 import logging
 from datetime import datetime
-from utils.sql_loader import get_query
+from utils.sql_loader import require_queries
+from utils.query_exec import one
+from utils.user_cache import get_user, prime_user
 from utils.swagger_loader import swagger_doc
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity, get_jwt, create_refresh_token, unset_refresh_cookies
 import hashlib
 from datetime import timedelta
 
 auth_api = Blueprint("auth_api", __name__)
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+require_queries('login_query', 'get_user_by_email')
+
 # ====================================
 # FUNCIONES AUXILIARES
 # ====================================
@@ -39,27 +39,19 @@ def login_process(email, password_hash):
         password_hash (str): Hash de la contraseña
         
     Returns:
-        pandas.DataFrame or None: Datos del usuario si las credenciales son válidas
+        dict or None: Datos del usuario si las credenciales son válidas
     """
     try:
-        logger.info(f"Verificando credenciales para: {email}")
+        logger.debug("Verificando credenciales para: %s", email)
         
-        # Verificar si existe el usuario con esas credenciales
-        count_query = pd.read_sql(
-            text(get_query('login_query')), 
-            engine, 
-            params={"email": email, "password_hash": password_hash}
-        )
+        # Una sola consulta: datos del usuario si existe con esas credenciales
+        user = one('login_query', {"email": email, "password_hash": password_hash})
         
-        if count_query['count'].iloc[0] > 0:
-            logger.info(f"Credenciales válidas para: {email}")
-            # Si existe, obtener información del usuario
-            user_df = pd.read_sql(
-                text(get_query('get_user_info')), 
-                engine, 
-                params={"email": email, "password_hash": password_hash}
-            )
-            return user_df
+        if user is not None:
+            logger.debug("Credenciales válidas para: %s", email)
+            # /verify y /refresh usarán este registro sin volver a la BD
+            prime_user(email, user)
+            return user
         else:
             logger.warning(f"Credenciales inválidas para: {email}")
             return None
@@ -100,7 +92,7 @@ def login():
             logger.warning(f"Formato de email inválido: {email}")
             return jsonify({"msg": "Formato de email inválido"}), 400
         
-        logger.info(f"Intento de login para: {email}")
+        logger.debug("Intento de login para: %s", email)
         
         # Usar la contraseña tal como viene (ya hasheada desde frontend)
         # Si quieres hashear aquí en el backend, descomenta la siguiente línea:
@@ -108,16 +100,13 @@ def login():
         password_hash = password  # Mantener si ya hasheas en frontend
         
         # Verificar credenciales contra la base de datos
-        user_df = login_process(email, password_hash)
+        user_data = login_process(email, password_hash)
         
-        if user_df is None or user_df.empty:
+        if user_data is None:
             logger.warning(f"Login fallido para: {email}")
             return jsonify({"msg": "Credenciales inválidas"}), 401
         
-        logger.info(f"Login exitoso para: {email}")
-        
-        # Obtener datos del usuario desde el DataFrame
-        user_data = user_df.iloc[0]
+        logger.info("Login exitoso para: %s", email)
         
         # Crear ambos tokens
         access_token = create_access_token(
@@ -136,7 +125,7 @@ def login():
             expires_delta=timedelta(days=7)  # 7 días explícito
         )
 
-        logger.info(f"Tokens generados para: {email}")
+        logger.debug("Tokens generados para: %s", email)
 
         # Preparar respuesta
         response_data = {
@@ -164,7 +153,7 @@ def login():
             path='/'                 # Disponible en toda la aplicación
         )
         
-        logger.info(f"Cookie refresh_token configurada para: {email}")
+        logger.debug("Cookie refresh_token configurada para: %s", email)
         
         return response, 200
         
@@ -185,24 +174,20 @@ def verify_token():
         current_user_email = get_jwt_identity()
         claims = get_jwt()
         
-        logger.info(f"Verificando token para: {current_user_email}")
+        logger.debug("Verificando token para: %s", current_user_email)
         
         # Opcional: Verificar en la base de datos que el usuario aún existe y está activo
         try:
             # Verificar que el usuario existe en la base de datos
             # Cambié "usuarios" por "nba.dim_users" para ser consistente
-            user_check = pd.read_sql(
-                text("SELECT email, username FROM nba.dim_users WHERE email = :email"), 
-                engine, 
-                params={"email": current_user_email}
-            )
+            # Registro cacheado unos segundos (utils/user_cache)
+            fresh_user_data = get_user(current_user_email)
             
-            if user_check.empty:
+            if fresh_user_data is None:
                 logger.warning(f"Usuario no encontrado en BD durante verificación: {current_user_email}")
                 return jsonify({"msg": "Usuario no encontrado"}), 404
                 
             # Actualizar información del usuario con datos frescos de la BD
-            fresh_user_data = user_check.iloc[0]
             user_info = {
                 "email": current_user_email,
                 "role": fresh_user_data.get('user_rol', claims.get("role", "user")),
@@ -244,12 +229,21 @@ def logout():
     """
     try:
         current_user = get_jwt_identity()
-        logger.info(f"Logout solicitado para usuario: {current_user}")
+        logger.info("Logout solicitado para usuario: %s", current_user)
+
+        # Revocar el access token y, si viene en la cookie, el refresh token
+        blocklist = current_app.extensions['token_blocklist']
+        claims = get_jwt()
+        blocklist.revoke(claims['jti'], claims['exp'])
 
-        # Aquí puedes añadir lógica adicional si decides implementar blacklist, etc.
-        # Por ejemplo:
-        # - Guardar el jti del token en Redis
-        # - Registrar el logout en la base de datos
+        refresh_token = request.cookies.get('refresh_token')
+        if refresh_token:
+            try:
+                from flask_jwt_extended import decode_token
+                refresh_claims = decode_token(refresh_token)
+                blocklist.revoke(refresh_claims['jti'], refresh_claims['exp'])
+            except Exception as token_error:
+                logger.warning(f"Refresh token no revocado en logout: {str(token_error)}")
 
         response = jsonify({
             "msg": "Logout exitoso",
@@ -286,7 +280,7 @@ def refresh_access_token():
                 "error": "missing_refresh_token"
             }), 401
         
-        logger.info("Refresh token encontrado en cookies")
+        logger.debug("Refresh token encontrado en cookies")
         
         # PASO 2: Verificar y decodificar el refresh token manualmente
         try:
@@ -297,7 +291,15 @@ def refresh_access_token():
             decoded_token = decode_token(refresh_token)
             current_user_email = decoded_token['sub']  # 'sub' contiene la identidad
             
-            logger.info(f"Renovando access token para: {current_user_email}")
+            # decode_token no consulta la blocklist: comprobar aquí el logout
+            if current_app.extensions['token_blocklist'].is_revoked(decoded_token['jti']):
+                logger.warning(f"Refresh token revocado para: {current_user_email}")
+                return jsonify({
+                    "msg": "Token ha sido revocado",
+                    "error": "token_revoked"
+                }), 401
+            
+            logger.debug("Renovando access token para: %s", current_user_email)
             
         except Exception as token_error:
             logger.error(f"Error decodificando refresh token: {str(token_error)}")
@@ -308,17 +310,12 @@ def refresh_access_token():
 
         # PASO 3: Verificar que el usuario aún existe en la BD
         try:
-            user_check = pd.read_sql(
-                text("SELECT email, user_rol, username, id FROM nba.dim_users WHERE email = :email"), 
-                engine, 
-                params={"email": current_user_email}
-            )
+            # Registro cacheado unos segundos (utils/user_cache)
+            user_data = get_user(current_user_email)
             
-            if user_check.empty:
+            if user_data is None:
                 logger.warning(f"Usuario no encontrado durante refresh: {current_user_email}")
                 return jsonify({"msg": "Usuario no encontrado"}), 404
-                
-            user_data = user_check.iloc[0]
             
         except Exception as db_error:
             logger.error(f"Error BD durante refresh: {str(db_error)}")
@@ -335,7 +332,7 @@ def refresh_access_token():
             }
         )
 
-        logger.info(f"Nuevo access token generado para: {current_user_email}")
+        logger.debug("Nuevo access token generado para: %s", current_user_email)
 
         # PASO 5: Respuesta con el nuevo token
         return jsonify({
@@ -0,0 +1,107 @@
+from flask import Blueprint, request, jsonify, current_app
+import asyncio
+import logging
+from utils.sql_loader import require_queries
+from utils.async_query_exec import all_mappings_async, one_async
+from utils.snapshot import snapshot_engine
+from utils.player_stats_store import player_stats_store
+from utils.swagger_loader import swagger_doc
+from routes.stats_routes import (
+  PLAYER_COLUMNS, parse_game_id, parse_batch_game_ids, batch_response, format_game_info, group_box_scores
+)
+
+# Same responses as stats_api, from async views: the independent queries of a
+# request run at the same time on the async engine (utils/async_query_exec)
+stats_async_api = Blueprint("stats_async_api", __name__)
+
+logger = logging.getLogger(__name__)
+
+require_queries('get_total_game_info', 'get_game_players', 'get_box_scores')
+
+async def load_box_score_async(game_id):
+  """
+  Box score of one game: game header and players fetched concurrently
+  Returns:
+      dict or None: {"game_info", "home_players", "away_players"}, None if the game does not exist
+  """
+  bind = snapshot_engine()
+
+  # Finished games: header from the database, rosters from the columnar store
+  store = player_stats_store()
+  if store is not None and store.has_game(game_id):
+    game = await one_async('get_total_game_info', {"game_id": game_id}, bind=bind)
+    if game is None:
+      return None
+
+    return {
+        "game_info": format_game_info(game),
+        "home_players": store.players(game_id, game['home_team_id']),
+        "away_players": store.players(game_id, game['away_team_id'])
+    }
+
+  logger.debug("Prepairing box score %s...", game_id)
+  game, players = await asyncio.gather(
+      one_async('get_total_game_info', {"game_id": game_id}, bind=bind),
+      all_mappings_async('get_game_players', {"game_id": game_id}, bind=bind)
+  )
+  if game is None:
+    return None
+
+  box_score = {"game_info": format_game_info(game), "home_players": [], "away_players": []}
+  for row in players:
+    player = {column: row[column] for column in PLAYER_COLUMNS}
+    if row['player_team_id'] == game['home_team_id']:
+      box_score["home_players"].append(player)
+    elif row['player_team_id'] == game['away_team_id']:
+      box_score["away_players"].append(player)
+  return box_score
+
+@stats_async_api.route("/by-game", methods=["POST"])
+@swagger_doc('get_game_stats')
+async def get_game_stats_async():
+  try:
+    data = request.get_json()
+    game_id = parse_game_id(data.get("game_id"))
+
+    if game_id is None:
+      return jsonify({
+            "success": False,
+            "error": data.get("game_id")
+        }), 400
+
+    box_score = await load_box_score_async(game_id)
+    if box_score is None:
+      return jsonify({"Error": "Game not found"}), 404
+
+    return jsonify(box_score)
+
+  except Exception as e:
+      return jsonify({"error": str(e)}), 500
+
+@stats_async_api.route("/by-game/batch", methods=["POST"])
+@swagger_doc('get_game_stats_batch')
+async def get_game_stats_batch_async():
+  try:
+    data = request.get_json()
+    game_ids, error = parse_batch_game_ids(data)
+    if error is not None:
+      return jsonify({"success": False, "error": error}), 400
+
+    # The batch split in chunks of STATS_ASYNC_BATCH_CHUNK games, queried concurrently
+    chunk_size = current_app.config['STATS_ASYNC_BATCH_CHUNK']
+    chunks = [game_ids[i:i + chunk_size] for i in range(0, len(game_ids), chunk_size)]
+    logger.debug("Prepairing %s box scores in %s queries...", len(game_ids), len(chunks))
+
+    bind = snapshot_engine()
+    results = await asyncio.gather(*(
+        all_mappings_async('get_box_scores', {"game_ids": chunk}, bind=bind)
+        for chunk in chunks
+    ))
+    box_scores = {}
+    for rows in results:
+      box_scores.update(group_box_scores(rows))
+
+    return jsonify(batch_response(game_ids, box_scores))
+
+  except Exception as e:
+      return jsonify({"error": str(e)}), 500
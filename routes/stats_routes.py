@@ -1,24 +1,25 @@
-from flask import Blueprint, request, jsonify
-from db import engine
-import pandas as pd
-from sqlalchemy import text
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context
 import logging
 from datetime import datetime
-from utils.sql_loader import get_query
+from utils.sql_loader import get_query, require_queries
+from utils.query_exec import all_mappings, one, iter_rows
+from utils.snapshot import snapshot_engine
+from utils.player_stats_store import player_stats_store
 from utils.swagger_loader import swagger_doc
-from datetime import datetime, timedelta
+from utils.http_cache import cacheable_json
+from datetime import datetime, timedelta, timezone
 
 stats_api = Blueprint("stats_api", __name__)
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def validate_game_id(game_id):
+require_queries('get_box_scores', 'get_total_game_info', 'get_total_date_info', 'get_date_range_info')
+
+def parse_game_id(game_id):
   try:
-      return pd.read_sql(text(get_query('validate_game_id')), engine, params={"game_id": int(game_id)})['count'].iloc[0] > 0
-  except Exception as e:
-      logger.error(f"Error validating game_id {game_id}: {e}")
-      return False
+      return int(game_id)
+  except (ValueError, TypeError):
+      return None
 
 def validate_game_date(date_string, date_format="%Y-%m-%d"):
   try:
@@ -27,59 +28,284 @@ def validate_game_date(date_string, date_format="%Y-%m-%d"):
   except (ValueError, TypeError):
       return False
 
+PLAYER_COLUMNS = (
+    "player_id", "player_name", "minutes_played", "points",
+    "field_goals_made", "field_goals_attempted", "three_pointers_made", "three_pointers_attempted",
+    "free_throws_made", "free_throws_attempted", "offensive_rebounds", "defensive_rebounds",
+    "total_rebounds", "assists", "steals", "blocks", "turnovers", "personal_fouls", "plus_minus",
+    "field_goal_percentage", "three_point_percentage", "free_throw_percentage",
+)
+
+def score(value):
+  # NULL until the game has been played
+  return int(value) if value is not None else None
+
+def format_game_info(row):
+  """
+  Game header of a box score (get_box_scores or get_total_game_info row).
+  Scores are None for games not played yet
+  """
+  return {
+      "game_id": int(row['id']),
+      "date": str(row['game_date']),
+      "home_team": str(row['home_team']),
+      "home_team_id": str(row['home_team_id']),
+      "home_score": score(row['home_score']),
+      "away_team": str(row['away_team']),
+      "away_team_id": str(row['away_team_id']),
+      "away_score": score(row['away_score']),
+  }
+
+def group_box_scores(rows):
+  """
+  Build the box score of every game from get_box_scores rows
+  (game header columns + one player per row, player columns NULL
+  when the game has no stats yet)
+  Returns:
+      dict: game_id -> {"game_info", "home_players", "away_players"}
+  """
+  games = {}
+  for row in rows:
+    game_id = int(row['id'])
+    box_score = games.get(game_id)
+    if box_score is None:
+      box_score = games[game_id] = {
+          "game_info": format_game_info(row),
+          "home_players": [],
+          "away_players": []
+      }
+
+    if row['player_id'] is None:
+      continue
+
+    player = {column: row[column] for column in PLAYER_COLUMNS}
+    if row['player_team_id'] == row['home_team_id']:
+      box_score["home_players"].append(player)
+    else:
+      box_score["away_players"].append(player)
+
+  return games
+
+def load_box_score(game_id):
+  """
+  Box score of one game
+  Returns:
+      tuple: ({"game_info", "home_players", "away_players"}, start of the game as returned by the driver),
+             (None, None) if the game does not exist
+  """
+  # Finished games: header from the database, rosters from the columnar store
+  store = player_stats_store()
+  if store is not None and store.has_game(game_id):
+    logger.debug("Prepairing box score %s from the player stats store...", game_id)
+    game = one('get_total_game_info', {"game_id": game_id}, bind=snapshot_engine())
+    if game is None:
+      return None, None
+
+    return {
+        "game_info": format_game_info(game),
+        "home_players": store.players(game_id, game['home_team_id']),
+        "away_players": store.players(game_id, game['away_team_id'])
+    }, game['game_date']
+
+  # Game header and both rosters in a single round trip
+  logger.debug("Prepairing box score %s...", game_id)
+  rows = all_mappings('get_box_scores', {"game_ids": [game_id]}, bind=snapshot_engine())
+  if not rows:
+    return None, None
+  return group_box_scores(rows)[game_id], rows[0]['game_date']
+
+def is_game_final(game_date, home_score, away_score):
+  """
+  A game is final once both scores are in and STATS_GAME_FINAL_AFTER_HOURS
+  have passed since its start (a late ingestion keeps it short-lived)
+  Args:
+      game_date (datetime): Start of the game, naive (server local time) or aware; None if unknown
+      home_score (int): None until the game has been loaded
+      away_score (int): None until the game has been loaded
+  """
+  if game_date is None or home_score is None or away_score is None:
+    return False
+  # Both sides in UTC: naive values are taken as local time, aware ones keep their offset
+  final_after = timedelta(hours=current_app.config['STATS_GAME_FINAL_AFTER_HOURS'])
+  return game_date.astimezone(timezone.utc) + final_after <= datetime.now(timezone.utc)
+
+def stats_max_age(final):
+  if final:
+    return current_app.config['STATS_FINAL_MAX_AGE']
+  return current_app.config['STATS_LIVE_MAX_AGE']
+
 @stats_api.route("/by-game", methods=["POST"])
 @swagger_doc('get_game_stats')
 def get_game_stats():
   try:
     # Get JSON data from request body
     data = request.get_json()
-    game_id = data.get("game_id")
-    
-    if validate_game_id(game_id):
-      logger.info(f"✅Game exists✅")
-      logger.info(f"Prepairing total info...")
-      game_info_df = pd.read_sql(text(get_query('get_total_game_info')), engine, params={"game_id": int(game_id)})
-
-      if game_info_df.empty:
-        return jsonify({"Error": "Game not found"}), 404
-      
-      logger.info(f"Prepairing players info...")
-
-      home_players_df = pd.read_sql(text(get_query('get_players_info')), engine, params={"game_id": int(game_id), "team_id": int(game_info_df['home_team_id'].iloc[0])})
-      away_players_df = pd.read_sql(text(get_query('get_players_info')), engine, params={"game_id": int(game_id), "team_id": int(game_info_df['away_team_id'].iloc[0])})
-      
-      #DEBUG
-      # home_players.to_json("home_df.json", orient="records", lines=True)
-      # print("✅ JSON file saved: home_df.json")
-      # away_players.to_json("away_df.json", orient="records", lines=True)
-      # print("✅ JSON file saved: away_df.json")
-
-      response_data = {
-          "game_info": {
-              "game_id": int(game_info_df['id'].iloc[0]),
-              "date": str(game_info_df['game_date'].iloc[0]),
-              "home_team": str(game_info_df['home_team'].iloc[0]),
-              "home_team_id": str(game_info_df['home_team_id'].iloc[0]),
-              "home_score": int(game_info_df['home_score'].iloc[0]),
-              "away_team": str(game_info_df['away_team'].iloc[0]),
-              "away_team_id": str(game_info_df['away_team_id'].iloc[0]),
-              "away_score": int(game_info_df['away_score'].iloc[0]),
-          },
-          "home_players": home_players_df.to_dict('records'),
-          "away_players": away_players_df.to_dict('records')
-      }
-    
-      return jsonify(response_data)
-    
-    else:
+    game_id = parse_game_id(data.get("game_id"))
+
+    if game_id is None:
       return jsonify({
             "success": False,
-            "error": game_id
+            "error": data.get("game_id")
         }), 400
 
+    box_score, _ = load_box_score(game_id)
+    if box_score is None:
+      return jsonify({"Error": "Game not found"}), 404
+
+    return jsonify(box_score)
+
+  except Exception as e:
+      return jsonify({"error": str(e)}), 500
+
+@stats_api.route("/games/<int:game_id>", methods=["GET"])
+@swagger_doc('get_game')
+def get_game(game_id):
+  """
+  Cacheable GET of /by-game: ETag, 304 and compressed body
+  """
+  try:
+    box_score, game_date = load_box_score(game_id)
+    if box_score is None:
+      return jsonify({"Error": "Game not found"}), 404
+
+    game_info = box_score["game_info"]
+    final = is_game_final(game_date, game_info["home_score"], game_info["away_score"])
+    return cacheable_json(box_score, stats_max_age(final))
+
   except Exception as e:
       return jsonify({"error": str(e)}), 500
     
+def parse_batch_game_ids(data):
+  """
+  Validate the game_ids of a /by-game/batch request
+  Returns:
+      tuple: (game ids in request order without repeats, None)
+             or (None, error message)
+  """
+  raw_ids = data.get("game_ids")
+  max_games = current_app.config['STATS_BATCH_MAX_GAMES']
+
+  if not isinstance(raw_ids, list) or not raw_ids:
+    return None, "game_ids must be a non-empty list"
+
+  game_ids = [parse_game_id(game_id) for game_id in raw_ids]
+  if None in game_ids:
+    return None, raw_ids[game_ids.index(None)]
+
+  # Keep request order, drop repeated ids
+  game_ids = list(dict.fromkeys(game_ids))
+  if len(game_ids) > max_games:
+    return None, f"Max {max_games} games per batch"
+  return game_ids, None
+
+def batch_response(game_ids, box_scores):
+  return {
+      "games_count": len(box_scores),
+      "games": [box_scores[game_id] for game_id in game_ids if game_id in box_scores],
+      "not_found": [game_id for game_id in game_ids if game_id not in box_scores]
+  }
+
+@stats_api.route("/by-game/batch", methods=["POST"])
+@swagger_doc('get_game_stats_batch')
+def get_game_stats_batch():
+  try:
+    data = request.get_json()
+    game_ids, error = parse_batch_game_ids(data)
+    if error is not None:
+      return jsonify({"success": False, "error": error}), 400
+
+    # Every game and roster in one set-based query, grouped in one pass
+    logger.debug("Prepairing %s box scores...", len(game_ids))
+    box_scores = group_box_scores(all_mappings('get_box_scores', {"game_ids": game_ids}, bind=snapshot_engine()))
+
+    return jsonify(batch_response(game_ids, box_scores))
+
+  except Exception as e:
+      return jsonify({"error": str(e)}), 500
+
+def format_game_datetime(value):
+  return value.strftime('%Y-%m-%d %H:%M:%S') if value is not None else None
+
+# Output key, games_with_best_performers column and conversion of the by-date responses
+DATE_GAME_FIELDS = (
+    ("game_id", "game_id", int),
+    ("date", "game_date", format_game_datetime),
+    ("home_team", "home_team", str),
+    ("home_team_short", "home_team_short", str),
+    ("home_team_id", "home_team_id", str),
+    ("home_score", "home_score", int),
+    ("home_best_fantasy_pointer", "home_best_fantasy_pointer", str),
+    ("home_best_fantasy_pointer_points", "home_best_fantasy_pointer_points", str),
+    ("home_best_scorer", "home_best_scorer", str),
+    ("home_best_scorer_points", "home_best_scorer_points", int),
+    ("home_best_rebounder", "home_best_rebounder", str),
+    ("home_best_rebounder_rebounds", "home_best_rebounder_rebounds", int),
+    ("home_best_assister", "home_best_assister", str),
+    ("home_best_assister_assists", "home_best_assister_assists", int),
+    ("away_team", "away_team", str),
+    ("away_team_short", "away_team_short", str),
+    ("away_team_id", "away_team_id", str),
+    ("away_score", "away_score", int),
+    ("away_best_fantasy_pointer", "away_best_fantasy_pointer", str),
+    ("away_best_fantasy_pointer_points", "away_best_fantasy_pointer_points", str),
+    ("away_best_scorer", "away_best_scorer", str),
+    ("away_best_scorer_points", "away_best_scorer_points", int),
+    ("away_best_rebounder", "away_best_rebounder", str),
+    ("away_best_rebounder_rebounds", "away_best_rebounder_rebounds", int),
+    ("away_best_assister", "away_best_assister", str),
+    ("away_best_assister_assists", "away_best_assister_assists", int),
+)
+
+def format_date_game(row):
+  """
+  Format one games_with_best_performers row for the by-date responses
+  """
+  game = {}
+  for key, column, convert in DATE_GAME_FIELDS:
+    value = row[column]
+    # Scores and best performers are NULL until the game has been played
+    game[key] = convert(value) if value is not None else None
+  return game
+
+def load_date_games(game_date):
+  """
+  Games of one date with their best performers
+  Args:
+      game_date (str): Validated date, YYYY-MM-DD
+  Returns:
+      tuple: ({"games_count", "date", "games_info"}, start of every game as returned by the driver),
+             (None, None) if no game was played that day
+  """
+  logger.debug("Prepairing game info for %s...", game_date)
+
+  try:
+    games = all_mappings(
+        'get_total_date_info',
+        {"game_date": datetime.strptime(game_date, "%Y-%m-%d").date()},
+        bind=snapshot_engine()
+    )
+  except Exception as e:
+    logger.error("Error executing query get_total_date_info (game_date=%s): %s", game_date, e)
+    logger.debug("Query: %s", get_query('get_total_date_info'))
+    raise
+
+  if not games:
+    return None, None
+
+  # Convert all games to proper format. A failure is an error of the whole
+  # day: an empty list would be cached as a valid answer
+  try:
+    games_list = [format_date_game(game) for game in games]
+  except Exception as e:
+    logger.error("Error formatting games of %s: %s", game_date, e)
+    raise
+
+  return {
+    "games_count": len(games_list),
+    "date": game_date,
+    "games_info": games_list
+  }, [game['game_date'] for game in games]
+
 @stats_api.route("/by-date", methods=["POST"])
 @swagger_doc('get_date_stats')
 def get_date_stats():
@@ -88,59 +314,9 @@ def get_date_stats():
     game_date = str(data.get("game_date"))
 
     if validate_game_date(game_date):
-      logger.info(f"✅Date is correct✅: "+game_date)
-      logger.info(f"Prepairing game info...")
-
-      try:
-        game_info_df = pd.read_sql(text(get_query('get_total_date_info')), engine, params={"game_date": game_date})
-      except Exception as e:
-        print(f"Error executing query: {e}")
-        print(f"Query: {get_query('get_total_date_info')}")
-        print(f"Params: {game_date}")
-
-      if game_info_df.empty:
+      response_data, _ = load_date_games(game_date)
+      if response_data is None:
         return jsonify({"error": "No game for this date"}), 404
-      
-      # Convert all games to proper format
-      games_list = []
-      try:
-        for _, row in game_info_df.iterrows():
-          games_list.append({
-              "game_id": int(row['game_id']),
-              "date": row['game_date'].strftime('%Y-%m-%d %H:%M:%S') if pd.notna(row['game_date']) else None,
-              "home_team": str(row['home_team']),
-              "home_team_short": str(row['home_team_short']),
-              "home_team_id": str(row['home_team_id']),
-              "home_score": int(row['home_score']),
-              "home_best_fantasy_pointer": str(row['home_best_fantasy_pointer']),
-              "home_best_fantasy_pointer_points": str(row['home_best_fantasy_pointer_points']),
-              "home_best_scorer": str(row['home_best_scorer']),
-              "home_best_scorer_points": int(row['home_best_scorer_points']),
-              "home_best_rebounder": str(row['home_best_rebounder']),
-              "home_best_rebounder_rebounds": int(row['home_best_rebounder_rebounds']),
-              "home_best_assister": str(row['home_best_assister']),
-              "home_best_assister_assists": int(row['home_best_assister_assists']),
-              "away_team": str(row['away_team']),
-              "away_team_short": str(row['away_team_short']),
-              "away_team_id": str(row['away_team_id']),
-              "away_score": int(row['away_score']),
-              "away_best_fantasy_pointer": str(row['away_best_fantasy_pointer']),
-              "away_best_fantasy_pointer_points": str(row['away_best_fantasy_pointer_points']),
-              "away_best_scorer": str(row['away_best_scorer']),
-              "away_best_scorer_points": int(row['away_best_scorer_points']),
-              "away_best_rebounder": str(row['away_best_rebounder']),
-              "away_best_rebounder_rebounds": int(row['away_best_rebounder_rebounds']),
-              "away_best_assister": str(row['away_best_assister']),
-              "away_best_assister_assists": int(row['away_best_assister_assists']),
-          })
-      except Exception as e:
-        print(f"Error formatting df: {e}")
-
-      response_data = {
-        "games_count": len(games_list),
-        "date": game_date,
-        "games_info": games_list
-      }
 
       return jsonify(response_data)
     else:
@@ -151,3 +327,96 @@ def get_date_stats():
        
   except Exception as e:
     return jsonify({"error": str(e)}), 500
+
+@stats_api.route("/dates/<game_date>", methods=["GET"])
+@swagger_doc('get_date_games')
+def get_date_games(game_date):
+  """
+  Cacheable GET of /by-date: ETag, 304 and compressed body
+  """
+  try:
+    if not validate_game_date(game_date):
+      return jsonify({"success": False, "error": game_date}), 400
+
+    response_data, game_dates = load_date_games(game_date)
+    if response_data is None:
+      return jsonify({"error": "No game for this date"}), 404
+
+    # Long-lived only once every game of the day is final
+    final = all(
+        is_game_final(start, game["home_score"], game["away_score"])
+        for start, game in zip(game_dates, response_data["games_info"], strict=True)
+    )
+    return cacheable_json(response_data, stats_max_age(final))
+
+  except Exception as e:
+    return jsonify({"error": str(e)}), 500
+
+@stats_api.route("/by-date-range", methods=["POST"])
+@swagger_doc('get_date_range_stats')
+def get_date_range_stats():
+  try:
+    data = request.get_json()
+    start_date = str(data.get("start_date"))
+    end_date = str(data.get("end_date"))
+    output_format = data.get("format", "ndjson")
+
+    if not validate_game_date(start_date) or not validate_game_date(end_date):
+      return jsonify({"success": False, "error": f"{start_date} - {end_date}"}), 400
+
+    # Compared as dates: strptime also accepts unpadded values (2024-9-30)
+    first_day = datetime.strptime(start_date, "%Y-%m-%d").date()
+    last_day = datetime.strptime(end_date, "%Y-%m-%d").date()
+    if first_day > last_day:
+      return jsonify({"success": False, "error": "start_date is after end_date"}), 400
+
+    if output_format not in ("ndjson", "json"):
+      return jsonify({"success": False, "error": output_format}), 400
+
+    params = {
+        "start_date": first_day,
+        # end_date is inclusive, the query takes an exclusive bound
+        "end_date": last_day + timedelta(days=1)
+    }
+    chunk_size = current_app.config['STATS_STREAM_CHUNK_SIZE']
+    bind = snapshot_engine()
+    dumps = current_app.json.dumps
+
+    logger.debug("Streaming games from %s to %s...", start_date, end_date)
+
+    # Rows come from a server-side cursor and are written as they arrive,
+    # so memory does not grow with the number of games in the range
+    def formatted_games():
+      # Runs once the 200 and the headers are sent: a row that cannot be
+      # formatted is skipped, a failed query ends the stream with an error record
+      try:
+        for row in iter_rows('get_date_range_info', params, bind=bind, yield_per=chunk_size):
+          try:
+            game = format_date_game(row)
+          except Exception as e:
+            logger.error("Skipping game %s of the date range stream: %s", row.get('game_id'), e)
+            continue
+          yield game
+      except Exception as e:
+        logger.error("Date range stream %s - %s interrupted: %s", start_date, end_date, e)
+        yield {"error": str(e)}
+
+    def generate_ndjson():
+      for game in formatted_games():
+        yield dumps(game) + "\n"
+
+    def generate_json_array():
+      separator = ""
+      yield "["
+      for game in formatted_games():
+        yield separator + dumps(game)
+        separator = ","
+      yield "]"
+
+    # The request context stays available to the generator (g: DB time of the access log)
+    if output_format == "ndjson":
+      return Response(stream_with_context(generate_ndjson()), mimetype="application/x-ndjson")
+    return Response(stream_with_context(generate_json_array()), mimetype="application/json")
+
+  except Exception as e:
+    return jsonify({"error": str(e)}), 500
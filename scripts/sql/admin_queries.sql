@@ -1,21 +1,49 @@
--- name: get_team_id
+-- name: get_teams
+-- tables: nba.dim_teams
 SELECT
-    id
+    id,
+    name,
+    short_name
 FROM
     nba.dim_teams
+
+-- name: get_players
+-- tables: nba.dim_players
+SELECT
+    id,
+    name,
+    team_id
+FROM
+    nba.dim_players
+
+-- name: lock_player_team
+-- tables: nba.dim_players
+-- params: player_id:int
+SELECT
+    team_id
+FROM
+    nba.dim_players
 WHERE
-    name ILIKE '%' || :name || '%'
+    id = :player_id
+FOR UPDATE
 
--- name: get_player_id
+-- name: lock_players_team
+-- tables: nba.dim_players
+-- params: player_ids:int[]
 SELECT
-    id
+    id,
+    team_id
 FROM
     nba.dim_players
 WHERE
-    name ILIKE '%' || :name || '%'
-    and team_id = :team_id
+    id IN :player_ids
+ORDER BY
+    id
+FOR UPDATE
 
 -- name: update_player_id
+-- tables: nba.dim_players
+-- params: new_team_id:int, player_id:int
 UPDATE 
     nba.dim_players 
 SET 
@@ -24,6 +52,8 @@ WHERE
     id = :player_id
 
 -- name: insert_market_transaction
+-- tables: nba.fact_market
+-- params: player_id:int, old_team_id:int, new_team_id:int
 INSERT INTO 
     nba.fact_market (player_id, old_team_id, new_team_id, operation_date)
 VALUES 
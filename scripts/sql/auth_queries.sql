@@ -1,17 +1,26 @@
 -- name: login_query
+-- tables: nba.dim_users
+-- params: email:str, password_hash:str
 SELECT 
-    COUNT(*) as count
+    u.id,
+    u.email,
+    u.username,
+    u.user_rol
 FROM 
     nba.dim_users u
 WHERE 
     u.email = :email
     and u.password_hash = :password_hash
 
--- name: get_user_info
+-- name: get_user_by_email
+-- tables: nba.dim_users
+-- params: email:str
 SELECT 
-    *
+    u.id,
+    u.email,
+    u.username,
+    u.user_rol
 FROM 
     nba.dim_users u
 WHERE 
-    u.email = :email
-    and u.password_hash = :password_hash
\ No newline at end of file
+    u.email = :email
\ No newline at end of file
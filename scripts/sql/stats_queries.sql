@@ -1,12 +1,8 @@
--- name: validate_game_id
-SELECT
-    COUNT(*) as count
-FROM
-    nba.dim_games
-WHERE
-    id = :game_id
-
 -- name: get_total_game_info
+-- tables: nba.dim_games, nba.dim_teams
+-- params: game_id:int
+-- columns: game_date:datetime
+-- ttl: 60
 SELECT 
     g.id,
     g.game_date,
@@ -22,6 +18,10 @@ JOIN nba.dim_teams at ON g.away_team_id = at.id
 WHERE g.id = :game_id
 
 -- name: get_total_date_info
+-- tables: nba.games_with_best_performers, nba.dim_games, nba.dim_teams, nba.dim_players, nba.fact_player_game_stats
+-- params: game_date:date
+-- columns: game_date:datetime
+-- ttl: 60
 SELECT
     *
 FROM
@@ -29,7 +29,25 @@ FROM
 WHERE 
     DATE(game_date) = :game_date
 
+-- name: get_date_range_info
+-- tables: nba.games_with_best_performers, nba.dim_games, nba.dim_teams, nba.dim_players, nba.fact_player_game_stats
+-- params: start_date:date, end_date:date
+-- columns: game_date:datetime
+SELECT
+    *
+FROM
+    nba.games_with_best_performers
+WHERE 
+    game_date >= :start_date
+    AND game_date < :end_date
+ORDER BY
+    game_date,
+    game_id
+
 -- name: get_players_info
+-- tables: nba.fact_player_game_stats
+-- params: game_id:int, team_id:int
+-- ttl: 60
 SELECT
     player_id,
     player_name, 
@@ -59,3 +77,114 @@ WHERE
     game_id = :game_id
     AND team_id = :team_id
 
+-- name: get_game_players
+-- tables: nba.fact_player_game_stats
+-- params: game_id:int
+-- ttl: 60
+SELECT
+    team_id as player_team_id,
+    player_id,
+    player_name, 
+    ROUND(minutes_played / 60.0) as minutes_played,
+    points,
+    field_goals_made,
+    field_goals_attempted,
+    three_pointers_made,
+    three_pointers_attempted, 
+    free_throws_made,
+    free_throws_attempted,
+    offensive_rebounds,
+    defensive_rebounds,
+    total_rebounds, 
+    assists,
+    steals,
+    blocks,
+    turnovers,
+    personal_fouls,
+    plus_minus,
+    field_goal_percentage,
+    three_point_percentage,
+    free_throw_percentage
+FROM 
+    nba.fact_player_game_stats
+WHERE 
+    game_id = :game_id
+
+-- name: get_box_scores
+-- tables: nba.dim_games, nba.dim_teams, nba.fact_player_game_stats
+-- params: game_ids:int[]
+-- columns: game_date:datetime
+-- ttl: 60
+SELECT 
+    g.id,
+    g.game_date,
+    ht.name as home_team,
+    g.home_team_id,
+    g.home_score,
+    at.name as away_team,
+    g.away_team_id,
+    g.away_score,
+    s.team_id as player_team_id,
+    s.player_id,
+    s.player_name, 
+    ROUND(s.minutes_played / 60.0) as minutes_played,
+    s.points,
+    s.field_goals_made,
+    s.field_goals_attempted,
+    s.three_pointers_made,
+    s.three_pointers_attempted, 
+    s.free_throws_made,
+    s.free_throws_attempted,
+    s.offensive_rebounds,
+    s.defensive_rebounds,
+    s.total_rebounds, 
+    s.assists,
+    s.steals,
+    s.blocks,
+    s.turnovers,
+    s.personal_fouls,
+    s.plus_minus,
+    s.field_goal_percentage,
+    s.three_point_percentage,
+    s.free_throw_percentage
+FROM nba.dim_games g
+JOIN nba.dim_teams ht ON g.home_team_id = ht.id
+JOIN nba.dim_teams at ON g.away_team_id = at.id
+LEFT JOIN nba.fact_player_game_stats s 
+    ON s.game_id = g.id
+    AND s.team_id IN (g.home_team_id, g.away_team_id)
+WHERE g.id IN :game_ids
+
+-- name: get_player_stats_range
+-- tables: nba.dim_games, nba.fact_player_game_stats
+-- params: start_date:date, end_date:date
+SELECT
+    s.game_id,
+    s.team_id,
+    s.player_id,
+    s.player_name,
+    ROUND(s.minutes_played / 60.0) as minutes_played,
+    s.points,
+    s.field_goals_made,
+    s.field_goals_attempted,
+    s.three_pointers_made,
+    s.three_pointers_attempted,
+    s.free_throws_made,
+    s.free_throws_attempted,
+    s.offensive_rebounds,
+    s.defensive_rebounds,
+    s.total_rebounds,
+    s.assists,
+    s.steals,
+    s.blocks,
+    s.turnovers,
+    s.personal_fouls,
+    s.plus_minus,
+    s.field_goal_percentage,
+    s.three_point_percentage,
+    s.free_throw_percentage
+FROM nba.fact_player_game_stats s
+JOIN nba.dim_games g ON g.id = s.game_id
+WHERE
+    g.game_date >= :start_date
+    AND g.game_date < :end_date
@@ -0,0 +1,119 @@
+import asyncio
+import os
+import threading
+import time
+from flask import g, has_request_context
+from utils.query_exec import _to_dict, all_mappings
+from utils.sql_loader import get_statement, cached_result_async
+
+class AsyncEngineRunner:
+    """
+    Async engine (asyncpg) living on its own event loop thread. Flask runs
+    every async view in a new event loop, and asyncpg connections belong to
+    the loop that opened them, so the pool stays on this loop and the views
+    await their queries through it. Started lazily, and again after a fork
+    """
+
+    def __init__(self):
+        self.url = None
+        self.engine_options = {}
+        self._lock = threading.Lock()
+        self._pid = None
+        self._loop = None
+        self._engine = None
+
+    def configure(self, url, **engine_options):
+        self.dispose()
+        self.url = url
+        self.engine_options = engine_options
+
+    def _start(self):
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            if self.url is None:
+                raise RuntimeError("Async engine not configured (STATS_ASYNC_ENABLED)")
+
+            from sqlalchemy.ext.asyncio import create_async_engine
+
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name='async-db', daemon=True).start()
+            engine = create_async_engine(self.url, **self.engine_options)
+            self._loop, self._engine, self._pid = loop, engine, os.getpid()
+
+    async def run(self, func, *args):
+        """
+        Run func(engine, *args), a coroutine function, on the engine's loop
+        """
+        if self._pid != os.getpid():
+            self._start()
+        future = asyncio.run_coroutine_threadsafe(func(self._engine, *args), self._loop)
+        return await asyncio.wrap_future(future)
+
+    def dispose(self):
+        """
+        Close the pooled connections and stop the loop thread
+        """
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = None
+                return
+            asyncio.run_coroutine_threadsafe(self._engine.dispose(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._pid, self._loop, self._engine = None, None, None
+
+_runner = AsyncEngineRunner()
+
+def configure_async_engine(url, **engine_options):
+    """
+    Set up the async engine used by the async stats views
+    Args:
+        url (str): postgresql+asyncpg:// URL
+        engine_options: Passed to create_async_engine (pool_size, ...)
+    """
+    _runner.configure(url, **engine_options)
+
+def dispose_async_engine():
+    _runner.dispose()
+
+async def _fetch_all(engine, query_name, params):
+    async with engine.connect() as conn:
+        start = time.perf_counter()
+        result = await conn.execute(get_statement(query_name), params)
+        elapsed = time.perf_counter() - start
+        return [_to_dict(row) for row in result], elapsed
+
+def _add_db_time(elapsed):
+    # Cursor events fire on the loop thread, outside the request: account here
+    if has_request_context():
+        g.db_time = g.get('db_time', 0.0) + elapsed
+        g.db_queries = g.get('db_queries', 0) + 1
+
+async def all_mappings_async(query_name, params=None, bind=None):
+    """
+    Async all_mappings: several calls can be awaited at once with asyncio.gather
+    Args:
+        query_name (str): Name of the query (from -- name: comment)
+        params (dict): Bound parameters
+        bind: Sync engine to run it on instead (e.g. the stats snapshot), in a thread
+    Returns:
+        list: One dict per row (shared when it comes from the result cache)
+    """
+    params = params or {}
+    if bind is not None:
+        return await asyncio.to_thread(all_mappings, query_name, params, bind)
+
+    async def load():
+        rows, elapsed = await _runner.run(_fetch_all, query_name, params)
+        _add_db_time(elapsed)
+        return rows
+
+    return await cached_result_async(query_name, params, load)
+
+async def one_async(query_name, params=None, bind=None):
+    """
+    Returns:
+        dict or None: First row, None if the query returned no rows
+    """
+    rows = await all_mappings_async(query_name, params, bind)
+    return rows[0] if rows else None
@@ -0,0 +1,183 @@
+import logging
+import os
+import threading
+import time
+from sqlalchemy import create_engine, text
+from db import DATABASE_URL, get_engine
+from utils.pool_stats import pool_stats
+from utils.sql_loader import list_queries
+
+logger = logging.getLogger(__name__)
+
+# A result older than this many intervals means the checker thread is stuck
+STALE_AFTER_INTERVALS = 3
+
+_PING = text("SELECT 1").execution_options(query_name='health_check')
+
+class HealthChecker:
+    """
+    Readiness of this worker, computed by a background thread every interval
+    seconds and cached, so a probe is a dict read. The database is pinged on
+    a connection of its own: a probe never waits for the app pool, and a
+    saturated pool is reported instead of hiding the ping
+    """
+
+    def __init__(self, interval=5.0, timeout=2.0, pool_saturation=0.9):
+        self.interval = interval
+        self.timeout = timeout
+        self.pool_saturation = pool_saturation
+        self._lock = threading.Lock()
+        self._pid = None
+        self._stop = None
+        self._checked = None
+        self._engine = None
+        self._result = None
+        self._last_timeouts = 0
+
+    def _ping_engine(self):
+        if self._engine is None:
+            # One persistent connection, short timeouts
+            self._engine = create_engine(
+                DATABASE_URL,
+                pool_size=1,
+                max_overflow=0,
+                pool_timeout=self.timeout,
+                pool_pre_ping=False,
+                connect_args={
+                    'connect_timeout': max(int(self.timeout), 1),
+                    'options': f"-c statement_timeout={int(self.timeout * 1000)}"
+                }
+            )
+        return self._engine
+
+    def _check_database(self):
+        start = time.perf_counter()
+        try:
+            with self._ping_engine().connect() as conn:
+                conn.execute(_PING)
+        except Exception as e:
+            # Start over with a new connection on the next check
+            self._ping_engine().dispose()
+            return {"ok": False, "error": str(e).splitlines()[0]}
+        return {"ok": True, "latency_ms": round((time.perf_counter() - start) * 1000, 3)}
+
+    def _check_pool(self):
+        stats = pool_stats.snapshot(get_engine().pool)
+        # reset() (benchmarks) starts the counter over
+        timeouts = max(stats["timeouts"] - self._last_timeouts, 0)
+        self._last_timeouts = stats["timeouts"]
+        pool = stats.get("pool")
+        if pool is None:
+            return {"ok": True}
+
+        capacity = pool["size"] + max(pool["max_overflow"], 0)
+        usage = pool["checked_out"] / capacity if capacity else 0.0
+        return {
+            "ok": usage < self.pool_saturation and timeouts == 0,
+            "checked_out": pool["checked_out"],
+            "capacity": capacity,
+            "usage": round(usage, 3),
+            "timeouts": timeouts  # Checkout timeouts since the previous check
+        }
+
+    def _check_registry(self):
+        try:
+            return {"ok": True, "queries": len(list_queries())}
+        except Exception as e:
+            return {"ok": False, "error": str(e)}
+
+    def check(self):
+        """
+        Run every check once and cache the result
+        Returns:
+            dict: {"ready", "checked_at", "checks": {name: {"ok", ...}}}
+        """
+        checks = {
+            "database": self._check_database(),
+            "pool": self._check_pool(),
+            "registry": self._check_registry(),
+        }
+        result = {
+            "ready": all(check["ok"] for check in checks.values()),
+            "checked_at": time.time(),
+            "checks": checks
+        }
+        if not result["ready"] and (self._result is None or self._result["ready"]):
+            logger.warning("Worker not ready: %s", {name: check for name, check in checks.items() if not check["ok"]})
+        self._result = result
+        return result
+
+    def _run(self, stop, checked):
+        while True:
+            try:
+                self.check()
+            except Exception as e:
+                logger.error("Health check failed: %s", e)
+            checked.set()
+            if stop.wait(self.interval):
+                return
+
+    def start(self, wait=False):
+        """
+        Start the background thread, which checks right away, unless it
+        already runs in this process (a forked worker starts its own)
+        Args:
+            wait (bool): Block until the first check is done (worker warm-up,
+                         never from a request)
+        """
+        with self._lock:
+            if self._pid != os.getpid():
+                # Connections inherited from the master belong to it
+                if self._engine is not None:
+                    self._engine.dispose(close=False)
+                self._result = None
+                self._stop = threading.Event()
+                self._checked = threading.Event()
+                threading.Thread(
+                    target=self._run, args=(self._stop, self._checked), name='health-check', daemon=True
+                ).start()
+                self._pid = os.getpid()
+        if wait:
+            # Connect and statement timeouts bound the first check
+            self._checked.wait(self.timeout * 2 + 1)
+
+    def stop(self):
+        with self._lock:
+            if self._stop is not None:
+                self._stop.set()
+            self._pid = None
+
+    def status(self):
+        """
+        Cached readiness, O(1). Not ready ("starting") until the first check
+        of the background thread is done
+        Returns:
+            tuple: (ready, report)
+        """
+        if self._pid != os.getpid():
+            self.start()
+
+        result = self._result
+        if result is None:
+            return False, {"status": "starting", "checks": {}}
+        age = time.time() - result["checked_at"]
+        stale = age > self.interval * STALE_AFTER_INTERVALS
+        return result["ready"] and not stale, {
+            "status": "ready" if result["ready"] and not stale else "not_ready",
+            "age_s": round(age, 3),
+            "stale": stale,
+            "checks": result["checks"]
+        }
+
+health_checker = HealthChecker()
+
+def configure_health(interval=None, timeout=None, pool_saturation=None):
+    """
+    Apply the HEALTH_* settings of the active config
+    """
+    if interval is not None:
+        health_checker.interval = interval
+    if timeout is not None:
+        health_checker.timeout = timeout
+    if pool_saturation is not None:
+        health_checker.pool_saturation = pool_saturation
@@ -0,0 +1,82 @@
+import gzip
+import hashlib
+from flask import current_app, request
+from utils.sql_loader import ResultCache
+
+try:
+    import brotli
+except ImportError:  # Optional: without it only gzip is offered
+    brotli = None
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# Compressed bodies by (ETag, encoding): a final box score is compressed once
+_compressed = ResultCache(max_entries=256)
+
+def supported_encodings():
+    """
+    Returns:
+        tuple: Content codings this server can produce, preferred first
+    """
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+def _compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+def configure_http_cache(max_entries=None):
+    """
+    Apply the COMPRESSION_CACHE_MAX_ENTRIES setting of the active config
+    """
+    if max_entries is not None:
+        _compressed.max_entries = max_entries
+
+def cacheable_json(payload, max_age):
+    """
+    JSON response for a GET that clients and CDNs may cache.
+    Args:
+        payload: Object to serialize with the app's JSON provider
+        max_age (int): Seconds for Cache-Control: public, max-age
+    Returns:
+        Response: 304 if If-None-Match matches the strong ETag (a hash of the
+                  JSON), otherwise the body compressed with the best coding the
+                  client accepts (br, gzip) when it is large enough
+    """
+    body = current_app.json.dumps(payload).encode('utf-8')
+    etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+    cache_control = f"public, max-age={max_age}"
+
+    encoding = None
+    if len(body) >= current_app.config['COMPRESSION_MIN_SIZE']:
+        encoding = request.accept_encodings.best_match(supported_encodings())
+    # Each encoding is a different representation, so it gets its own strong
+    # ETag ("<hash>-gzip"); any of them validates the same JSON
+    response_etag = f"{etag}-{encoding}" if encoding else etag
+
+    if request.if_none_match and any(
+        request.if_none_match.contains_weak(tag)
+        for tag in (etag, *(f"{etag}-{coding}" for coding in supported_encodings()))
+    ):
+        response = current_app.response_class(status=304)
+        response.set_etag(response_etag)
+        response.headers['Cache-Control'] = cache_control
+        response.vary.add('Accept-Encoding')
+        return response
+
+    if encoding:
+        key = (etag, encoding)
+        hit, compressed = _compressed.get(key)
+        if not hit:
+            compressed = _compress(body, encoding)
+            _compressed.set(key, compressed, ttl=max_age)
+        body = compressed
+
+    response = current_app.response_class(body, mimetype=current_app.json.mimetype)
+    response.set_etag(response_etag)
+    response.headers['Cache-Control'] = cache_control
+    response.vary.add('Accept-Encoding')
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    return response
@@ -0,0 +1,182 @@
+import threading
+import time
+from bisect import bisect_left
+from flask import g, has_request_context
+from sqlalchemy import event
+from utils.json_provider import FastJSONProvider
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# Upper bounds of the rows-per-query histogram buckets
+ROW_BUCKETS = (0, 1, 5, 10, 50, 100, 500, 1000, 5000, 10000)
+
+# Label of statements that did not come from the sql_loader registry
+UNNAMED_QUERY = 'unnamed'
+# Route label of requests that matched no URL rule (keeps 404 scans out of the labels)
+UNMATCHED_ROUTE = 'unmatched'
+
+# ====================================
+# HISTOGRAMS
+# ====================================
+class Histogram:
+    """
+    Prometheus-style histogram with one series per label tuple
+    """
+
+    def __init__(self, name, description, label_names, buckets):
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}  # labels -> [bucket counts (non-cumulative), sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def render(self):
+        """
+        Returns:
+            list: Lines of the histogram in Prometheus text format
+        """
+        with self._lock:
+            series = [(labels, list(counts), total, count) for labels, (counts, total, count) in self._series.items()]
+
+        lines = [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} histogram",
+        ]
+        for labels, counts, total, count in sorted(series):
+            label_text = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, labels))
+            prefix = label_text + ',' if label_text else ''
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {count}')
+            lines.append(f'{self.name}_sum{{{label_text}}} {total}')
+            lines.append(f'{self.name}_count{{{label_text}}} {count}')
+        return lines
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+class Metrics:
+    """
+    Latency of every request (by route) and of every statement (by sql_loader
+    query name). Counters live in the worker process: each worker exposes its own
+    """
+
+    def __init__(self):
+        self.request_latency = Histogram(
+            'api_request_duration_seconds', 'Request latency by route',
+            ('method', 'route', 'status'), LATENCY_BUCKETS
+        )
+        self.query_latency = Histogram(
+            'api_db_query_duration_seconds', 'Statement latency by named query',
+            ('query',), LATENCY_BUCKETS
+        )
+        self.query_rows = Histogram(
+            'api_db_query_rows', 'Rows returned or affected by named query',
+            ('query',), ROW_BUCKETS
+        )
+
+    def observe_request(self, method, route, status, seconds):
+        self.request_latency.observe((method, route or UNMATCHED_ROUTE, str(status)), seconds)
+
+    def observe_query(self, query_name, seconds, rows=None):
+        self.query_latency.observe((query_name,), seconds)
+        if rows is not None and rows >= 0:
+            self.query_rows.observe((query_name,), rows)
+
+    def reset(self):
+        for histogram in (self.request_latency, self.query_latency, self.query_rows):
+            histogram.reset()
+
+    def render_prometheus(self):
+        """
+        Returns:
+            str: Every histogram in Prometheus text exposition format (0.0.4)
+        """
+        lines = []
+        for histogram in (self.request_latency, self.query_latency, self.query_rows):
+            lines.extend(histogram.render())
+        return '\n'.join(lines) + '\n'
+
+metrics = Metrics()
+
+# ====================================
+# DB TIME PER REQUEST AND PER QUERY
+# ====================================
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_start = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, '_query_start', None)
+    if start is None:
+        return
+    elapsed = time.perf_counter() - start
+
+    # Registry statements carry their name (NamedQuery sets execution_options).
+    # rowcount is -1 on server-side cursors, where rows are not known yet
+    metrics.observe_query(context.execution_options.get('query_name', UNNAMED_QUERY), elapsed, cursor.rowcount)
+
+    if has_request_context():
+        g.db_time = g.get('db_time', 0.0) + elapsed
+        g.db_queries = g.get('db_queries', 0) + 1
+
+def install_db_timing(engine):
+    """
+    Time every statement run on the engine (every engine when given the
+    Engine class): per query name in metrics, and accumulated for the current
+    request (g.db_time, g.db_queries). Safe to call more than once
+    """
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+# ====================================
+# SERIALIZATION TIME AND SERVER-TIMING
+# ====================================
+class TimedJSONProvider(FastJSONProvider):
+    """
+    JSON provider (utils/json_provider) that accumulates the time spent
+    serializing in g.serialize_time (jsonify and current_app.json.dumps go
+    through dumps)
+    """
+
+    def dumps(self, obj, **kwargs):
+        if not has_request_context():
+            return super().dumps(obj, **kwargs)
+        start = time.perf_counter()
+        try:
+            return super().dumps(obj, **kwargs)
+        finally:
+            g.serialize_time = g.get('serialize_time', 0.0) + (time.perf_counter() - start)
+
+def server_timing_header(db_time, serialize_time, total):
+    """
+    Args:
+        db_time (float): Seconds spent in the database
+        serialize_time (float): Seconds spent serializing JSON
+        total (float): Seconds spent handling the request
+    Returns:
+        str: Value of the Server-Timing header, durations in milliseconds
+    """
+    return (
+        f"db;dur={db_time * 1000:.3f}, "
+        f"serialize;dur={serialize_time * 1000:.3f}, "
+        f"total;dur={total * 1000:.3f}"
+    )
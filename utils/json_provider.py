@@ -0,0 +1,54 @@
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # Optional: without it the stdlib json module is used
+    orjson = None
+
+def _default(o):
+    # NumPy scalars and arrays (numpy is not imported for this)
+    if hasattr(o, 'dtype'):
+        if hasattr(o, 'tolist'):
+            return o.tolist()
+        return o.item()
+    return DefaultJSONProvider.default(o)
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider backed by orjson when it is installed. Output matches
+    Flask's provider: sorted keys, dates as HTTP dates, Decimal and UUID as
+    strings, dataclasses as objects, plus NumPy values. Non-ASCII text is
+    written as UTF-8 instead of \\u escapes
+    """
+
+    default = staticmethod(_default)
+
+    if orjson is not None:
+        _options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_SERIALIZE_NUMPY
+
+    def dumps(self, obj, **kwargs):
+        """
+        Serialize to a JSON string. Calls with arguments orjson has no
+        equivalent for go through the stdlib json module
+        """
+        if orjson is None:
+            return super().dumps(obj, **kwargs)
+
+        # response() asks for indent=2 (debug) or compact separators
+        options = kwargs.copy()
+        indent = options.pop('indent', None)
+        separators = options.pop('separators', None)
+        if options or indent not in (None, 2) or separators not in (None, (',', ':')):
+            return super().dumps(obj, **kwargs)
+
+        option = self._options
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self.default, option=option).decode()
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
@@ -0,0 +1,25 @@
+import importlib.util
+import sys
+
+def lazy_import(name):
+    """
+    Import a module on first attribute access instead of now
+    Args:
+        name (str): Module name, e.g. 'numpy'
+    Returns:
+        module: The module (already loaded) or a lazy module registered in
+                sys.modules that runs its code when first used
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named {name!r}", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
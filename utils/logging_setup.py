@@ -0,0 +1,94 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+
+ACCESS_LOGGER = 'api.access'
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+class LogFormatter(logging.Formatter):
+    """
+    Text for application logs, one JSON object per line for access records
+    """
+
+    def format(self, record):
+        if record.name == ACCESS_LOGGER:
+            data = {'ts': round(record.created, 3), 'level': record.levelname}
+            data.update(getattr(record, 'access', {}))
+            return json.dumps(data, separators=(',', ':'), default=str)
+        return super().format(record)
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that leaves formatting to the listener thread. The stock
+    prepare() renders the message on the calling (request) thread
+    """
+
+    def prepare(self, record):
+        return record
+
+_listener = None
+
+def setup_logging(level='INFO'):
+    """
+    Route every log record through a queue: the request thread only enqueues,
+    a background thread formats and writes. Safe to call more than once
+    """
+    global _listener
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    if _listener is not None:
+        return
+
+    log_queue = queue.SimpleQueue()
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(LogFormatter(TEXT_FORMAT))
+
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(DeferredQueueHandler(log_queue))
+
+    _listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+    os.register_at_fork(after_in_child=_restart_listener)
+
+def _restart_listener():
+    # A forked worker (gunicorn preload) does not inherit the listener thread:
+    # start a new one on a fresh queue
+    log_queue = queue.SimpleQueue()
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, DeferredQueueHandler):
+            handler.queue = log_queue
+    _listener.queue = log_queue
+    _listener._thread = None
+    _listener.start()
+
+access_logger = logging.getLogger(ACCESS_LOGGER)
+
+def log_access(method, route, path, status, duration, db_time, db_queries, remote_addr, sample_rate=1.0):
+    """
+    Emit the access record of a request. Non-2xx responses are always logged,
+    2xx ones only for a sample_rate fraction of requests
+    """
+    if 200 <= status < 300 and sample_rate < 1.0 and random.random() >= sample_rate:
+        return
+    if not access_logger.isEnabledFor(logging.INFO):
+        return
+
+    access_logger.info('access', extra={'access': {
+        'method': method,
+        'route': route,
+        'path': path,
+        'status': status,
+        'duration_ms': round(duration * 1000, 3),
+        'db_ms': round(db_time * 1000, 3),
+        'db_queries': db_queries,
+        'remote_addr': remote_addr,
+        'sampled': sample_rate if 200 <= status < 300 else 1.0,
+    }})
@@ -0,0 +1,301 @@
+import re
+import threading
+import time
+import unicodedata
+from utils.query_exec import all_mappings
+
+# Minimum share of the query's word trigrams found in a name for a fuzzy
+# match (pg_trgm's word_similarity_threshold is 0.6)
+FUZZY_THRESHOLD = 0.5
+# A fuzzy match must beat the runner-up by this much, or the name is ambiguous
+FUZZY_MARGIN = 0.1
+# A player not found in the old team is looked up again on a build at most
+# this old (seconds): another worker may have traded them in since the build
+UNKNOWN_PLAYER_MAX_AGE = 1.0
+
+class NameResolutionError(ValueError):
+    """
+    A name could not be resolved to exactly one team or player
+    """
+
+    def __init__(self, kind, name, candidates=()):
+        self.kind = kind
+        self.name = name
+        self.candidates = list(candidates)
+        super().__init__(self.message())
+
+    def message(self):
+        return f"No {self.kind} found for '{self.name}'"
+
+class UnknownNameError(NameResolutionError):
+    pass
+
+class AmbiguousNameError(NameResolutionError):
+    def message(self):
+        return f"Ambiguous {self.kind} name '{self.name}': {', '.join(self.candidates)}"
+
+def normalize(name):
+    """
+    Lowercase, without accents or punctuation, single spaces
+    ("Luka Dončić" -> "luka doncic", "Gilgeous-Alexander" -> "gilgeous alexander")
+    """
+    text = unicodedata.normalize('NFKD', str(name)).encode('ascii', 'ignore').decode('ascii')
+    text = re.sub(r"[^a-z0-9]+", ' ', text.lower())
+    return text.strip()
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+def word_trigrams(text):
+    """
+    Trigrams of each word padded like pg_trgm ("  w", " wo", "wor", "ord", "rd ")
+    """
+    result = set()
+    for word in text.split():
+        result |= trigrams(f"  {word} ")
+    return result
+
+class NameIndex:
+    """
+    Normalized names and aliases of one kind of entity, with a trigram index
+    over them for substring lookups and one of word trigrams for fuzzy ones
+    """
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.names = {}      # id -> display name
+        self._keys = {}      # normalized name or alias -> set of ids
+        self._postings = {}  # trigram -> set of keys
+        self._word_postings = {}  # word trigram -> set of keys
+
+    def add(self, entity_id, name, aliases=()):
+        self.names[entity_id] = name
+        for alias in (name, *aliases):
+            key = normalize(alias)
+            if not key:
+                continue
+            if key not in self._keys:
+                self._keys[key] = set()
+                for trigram in trigrams(key):
+                    self._postings.setdefault(trigram, set()).add(key)
+                for trigram in word_trigrams(key):
+                    self._word_postings.setdefault(trigram, set()).add(key)
+            self._keys[key].add(entity_id)
+
+    def _ids(self, keys, allowed):
+        ids = set()
+        for key in keys:
+            ids |= self._keys[key]
+        return ids if allowed is None else ids & allowed
+
+    def _ambiguous(self, name, ids):
+        return AmbiguousNameError(self.kind, name, sorted(self.names[entity_id] for entity_id in ids))
+
+    def resolve(self, name, allowed=None):
+        """
+        Resolve a name: exact name or alias, then unique substring (what the
+        old ILIKE '%name%' lookup accepted), then trigram similarity
+        Args:
+            name (str): Name as typed
+            allowed (set): Only consider these ids (e.g. players of a team)
+        Returns:
+            The id of the single match
+        Raises:
+            UnknownNameError: Nothing matches
+            AmbiguousNameError: More than one entity matches equally well
+        """
+        query = normalize(name)
+        if not query:
+            raise UnknownNameError(self.kind, name)
+
+        ids = self._ids([query], allowed) if query in self._keys else set()
+        if len(ids) == 1:
+            return ids.pop()
+        if ids:
+            raise self._ambiguous(name, ids)
+
+        query_trigrams = trigrams(query)
+        if not query_trigrams:
+            raise UnknownNameError(self.kind, name)
+
+        # Substring: keys holding every trigram of the query, then checked
+        postings = [self._postings.get(trigram, set()) for trigram in query_trigrams]
+        candidates = set.intersection(*postings)
+        ids = self._ids([key for key in candidates if query in key], allowed)
+        if len(ids) == 1:
+            return ids.pop()
+        if ids:
+            raise self._ambiguous(name, ids)
+
+        # Fuzzy: share of the query's word trigrams present in each key
+        # (typos, missing letters), best key per id
+        query_trigrams = word_trigrams(query)
+        shared = {}
+        for trigram in query_trigrams:
+            for key in self._word_postings.get(trigram, ()):
+                shared[key] = shared.get(key, 0) + 1
+        scores = {}
+        for key, count in shared.items():
+            similarity = count / len(query_trigrams)
+            if similarity < FUZZY_THRESHOLD:
+                continue
+            for entity_id in self._ids([key], allowed):
+                scores[entity_id] = max(scores.get(entity_id, 0.0), similarity)
+
+        if not scores:
+            raise UnknownNameError(self.kind, name)
+        best = max(scores.values())
+        close = {entity_id for entity_id, score in scores.items() if best - score < FUZZY_MARGIN}
+        if len(close) > 1:
+            raise self._ambiguous(name, close)
+        return close.pop()
+
+class TradeNameResolver:
+    """
+    Team and player indexes used by the trade tool, built from nba.dim_teams
+    and nba.dim_players. Rebuilt after ttl seconds or once invalidated, by
+    one thread while the others wait for it; trades made by this worker are
+    applied right away (move_player)
+    """
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._built_at = None  # Start of the last build (monotonic)
+        self._invalidated_at = float('-inf')
+        self._teams = None
+        self._players = None
+        self._player_team = {}  # player id -> team id
+        self._team_players = {}  # team id -> set of player ids
+
+    def refresh(self):
+        # A build that starts before an invalidate() is stale when it ends
+        started = time.monotonic()
+        teams = NameIndex('team')
+        for row in all_mappings('get_teams'):
+            name = row['name']
+            words = name.split()
+            aliases = [row['short_name']]
+            if len(words) > 1:
+                aliases += [words[-1], ' '.join(words[:-1])]  # Nickname and city
+            teams.add(int(row['id']), name, aliases)
+
+        players = NameIndex('player')
+        player_team = {}
+        for row in all_mappings('get_players'):
+            name = row['name']
+            words = name.split()
+            players.add(int(row['id']), name, [words[-1]] if len(words) > 1 else [])
+            player_team[int(row['id'])] = int(row['team_id']) if row['team_id'] is not None else None
+
+        team_players = {}
+        for player_id, team_id in player_team.items():
+            team_players.setdefault(team_id, set()).add(player_id)
+
+        with self._lock:
+            self._teams, self._players = teams, players
+            self._player_team, self._team_players = player_team, team_players
+            self._built_at = started
+
+    def invalidate(self):
+        with self._lock:
+            self._invalidated_at = time.monotonic()
+
+    def _is_fresh(self, max_age):
+        built_at = self._built_at
+        return (
+            built_at is not None
+            and built_at > self._invalidated_at
+            and time.monotonic() - built_at <= max_age
+        )
+
+    def _ensure_fresh(self, max_age=None):
+        max_age = self.ttl if max_age is None else max_age
+        if self._is_fresh(max_age):
+            return
+        # Double-checked: threads that waited for a build use it
+        with self._build_lock:
+            if not self._is_fresh(max_age):
+                self.refresh()
+
+    def _indexes(self):
+        self._ensure_fresh()
+        with self._lock:
+            return self._teams, self._players, self._team_players
+
+    @staticmethod
+    def _resolve(indexes, player_name, old_team_name, new_team_name):
+        teams, players, team_players = indexes
+        old_team_id = teams.resolve(old_team_name)
+        new_team_id = teams.resolve(new_team_name)
+        player_id = players.resolve(player_name, allowed=team_players.get(old_team_id, set()))
+        return player_id, old_team_id, new_team_id
+
+    def _rebuild_stale(self):
+        # Rebuilds are shared and skipped if the build is recent enough, so
+        # misspelt names cannot make every request rebuild the indexes
+        self._ensure_fresh(UNKNOWN_PLAYER_MAX_AGE)
+        return self._indexes()
+
+    def resolve_trade(self, player_name, old_team_name, new_team_name):
+        """
+        Resolve the three names of a trade. The player is looked up among the
+        players of the old team only, and once more on a fresh build if not
+        found there
+        Returns:
+            tuple: (player_id, old_team_id, new_team_id)
+        Raises:
+            NameResolutionError: If any of them is unknown or ambiguous
+        """
+        try:
+            return self._resolve(self._indexes(), player_name, old_team_name, new_team_name)
+        except UnknownNameError as e:
+            if e.kind != 'player':
+                raise
+        return self._resolve(self._rebuild_stale(), player_name, old_team_name, new_team_name)
+
+    def resolve_trades(self, trades):
+        """
+        Resolve the names of several trades against the same build of the
+        indexes. If a player is not found, every trade is resolved again on a
+        fresh build
+        Args:
+            trades (list): (player_name, old_team_name, new_team_name) tuples
+        Returns:
+            list: (player_id, old_team_id, new_team_id) tuple, or the
+                  NameResolutionError raised for it, per trade
+        """
+        results = self._resolve_all(self._indexes(), trades)
+        if any(isinstance(result, UnknownNameError) and result.kind == 'player' for result in results):
+            results = self._resolve_all(self._rebuild_stale(), trades)
+        return results
+
+    def _resolve_all(self, indexes, trades):
+        results = []
+        for player_name, old_team_name, new_team_name in trades:
+            try:
+                results.append(self._resolve(indexes, player_name, old_team_name, new_team_name))
+            except NameResolutionError as e:
+                results.append(e)
+        return results
+
+    def move_player(self, player_id, team_id):
+        """
+        Apply a trade to the indexes without waiting for the next rebuild
+        """
+        with self._lock:
+            old_team_id = self._player_team.get(player_id)
+            if old_team_id is not None:
+                self._team_players.get(old_team_id, set()).discard(player_id)
+            self._player_team[player_id] = team_id
+            self._team_players.setdefault(team_id, set()).add(player_id)
+
+name_resolver = TradeNameResolver()
+
+def configure_name_index(ttl=None):
+    """
+    Apply the NAME_INDEX_TTL setting of the active config
+    """
+    if ttl is not None:
+        name_resolver.ttl = ttl
@@ -0,0 +1,308 @@
+"""
+Columnar store of the player stats of finished games.
+
+Stats of a game do not change once it has been played, so they are exported
+into one NumPy array per column (sorted by game_id, team_id) and opened with
+mmap: every worker maps the same files and the OS keeps a single copy in the
+page cache. A box score is two binary searches and a slice.
+
+The store is a list of segments. A build writes every finished game into one
+segment; an update only writes the games finished since the last run, as a
+new segment, so its cost does not grow with the store. A game is looked up in
+each segment, newest first: run build again now and then to merge them.
+
+Layout of the store directory:
+    manifest.json       segments, row count and date watermark
+    v000001/<col>.npy   one file per column of a segment
+
+Usage:
+    python -m utils.player_stats_store build <dir>    # every finished game, one segment
+    python -m utils.player_stats_store update <dir>   # games finished since the last run, new segment
+"""
+import argparse
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import date
+from utils.lazy_import import lazy_import
+from utils.query_exec import iter_rows
+
+# Loaded when a store is first opened or built, not when the app starts
+np = lazy_import('numpy')
+
+MANIFEST = 'manifest.json'
+EXPORT_CHUNK_SIZE = 5000
+
+# Column -> kind. Numbers are stored as float64 so NULL can be NaN; the kind
+# restores the type the query returns ('str' NULLs are stored as '')
+COLUMNS = {
+    'game_id': 'key',
+    'team_id': 'key',
+    'player_id': 'int',
+    'player_name': 'str',
+    'minutes_played': 'float',
+    'points': 'int',
+    'field_goals_made': 'int',
+    'field_goals_attempted': 'int',
+    'three_pointers_made': 'int',
+    'three_pointers_attempted': 'int',
+    'free_throws_made': 'int',
+    'free_throws_attempted': 'int',
+    'offensive_rebounds': 'int',
+    'defensive_rebounds': 'int',
+    'total_rebounds': 'int',
+    'assists': 'int',
+    'steals': 'int',
+    'blocks': 'int',
+    'turnovers': 'int',
+    'personal_fouls': 'int',
+    'plus_minus': 'int',
+    'field_goal_percentage': 'float',
+    'three_point_percentage': 'float',
+    'free_throw_percentage': 'float',
+}
+PLAYER_COLUMNS = tuple(name for name, kind in COLUMNS.items() if kind != 'key')
+
+# ====================================
+# READER
+# ====================================
+def _restore(kind, values):
+    if kind == 'int':
+        return [None if value != value else int(value) for value in values]
+    if kind == 'float':
+        return [None if value != value else value for value in values]
+    return [value or None for value in values]
+
+class _Segment:
+    """
+    Columns of one segment, memory-mapped
+    """
+
+    def __init__(self, segment_dir):
+        self.columns = {
+            name: np.load(os.path.join(segment_dir, f"{name}.npy"), mmap_mode='r')
+            for name in COLUMNS
+        }
+        self.game_ids = self.columns['game_id']
+        self.team_ids = self.columns['team_id']
+
+    def game_range(self, game_id):
+        lo = int(np.searchsorted(self.game_ids, game_id, side='left'))
+        hi = int(np.searchsorted(self.game_ids, game_id, side='right'))
+        return lo, hi
+
+class PlayerStatsStore:
+    """
+    Read-only view of the segments listed in the manifest
+    """
+
+    def __init__(self, path):
+        with open(os.path.join(path, MANIFEST)) as f:
+            self.manifest = json.load(f)
+        self.segments = [_Segment(os.path.join(path, name)) for name in _segment_names(self.manifest)]
+
+    def __len__(self):
+        return sum(len(segment.game_ids) for segment in self.segments)
+
+    def _locate(self, game_id):
+        # Segments hold disjoint date ranges: a game is in one of them at most
+        for segment in reversed(self.segments):
+            lo, hi = segment.game_range(game_id)
+            if hi > lo:
+                return segment, lo, hi
+        return None, 0, 0
+
+    def has_game(self, game_id):
+        return self._locate(game_id)[0] is not None
+
+    def players(self, game_id, team_id):
+        """
+        Stats of a team's players in a game, as get_box_scores returns them
+        Returns:
+            list: One dict per player (PLAYER_COLUMNS), empty if not stored
+        """
+        segment, lo, hi = self._locate(game_id)
+        if segment is None:
+            return []
+        start = lo + int(np.searchsorted(segment.team_ids[lo:hi], team_id, side='left'))
+        end = lo + int(np.searchsorted(segment.team_ids[lo:hi], team_id, side='right'))
+        if end == start:
+            return []
+
+        values = [
+            _restore(COLUMNS[name], segment.columns[name][start:end].tolist())
+            for name in PLAYER_COLUMNS
+        ]
+        return [dict(zip(PLAYER_COLUMNS, row)) for row in zip(*values)]
+
+class _StoreHandle:
+    """
+    Current version of the store: a new manifest (build or update run) is
+    picked up at most CHECK_INTERVAL seconds later
+    """
+
+    CHECK_INTERVAL = 1.0
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._last_check = time.monotonic()
+        self._mtime = os.path.getmtime(os.path.join(path, MANIFEST))
+        self._store = PlayerStatsStore(path)
+
+    def store(self):
+        if time.monotonic() - self._last_check > self.CHECK_INTERVAL:
+            with self._lock:
+                self._last_check = time.monotonic()
+                mtime = os.path.getmtime(os.path.join(self.path, MANIFEST))
+                if mtime != self._mtime:
+                    self._store = PlayerStatsStore(self.path)
+                    self._mtime = mtime
+        return self._store
+
+_handle = None
+
+def configure_player_stats_store(path):
+    """
+    Apply the PLAYER_STATS_STORE_PATH setting of the active config
+    Args:
+        path (str): Store directory, None or empty to disable it
+    Raises:
+        FileNotFoundError: If the directory has no manifest (run build first)
+    """
+    global _handle
+    _handle = _StoreHandle(path) if path else None
+
+def player_stats_store():
+    """
+    Returns:
+        PlayerStatsStore or None: Current store, None when disabled
+    """
+    return _handle.store() if _handle is not None else None
+
+# ====================================
+# BUILD AND APPEND
+# ====================================
+def _fetch_columns(start_date, end_date, bind=None):
+    data = {name: [] for name in COLUMNS}
+    for row in iter_rows('get_player_stats_range', {'start_date': start_date, 'end_date': end_date},
+                         bind=bind, yield_per=EXPORT_CHUNK_SIZE):
+        for name in COLUMNS:
+            data[name].append(row[name])
+
+    arrays = {}
+    for name, kind in COLUMNS.items():
+        values = data[name]
+        if kind == 'key':
+            arrays[name] = np.array(values, dtype=np.int64)
+        elif kind == 'str':
+            arrays[name] = np.array(['' if value is None else value for value in values], dtype=np.str_)
+        else:
+            arrays[name] = np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+    return arrays
+
+def _segment_names(manifest):
+    # Stores written before segments have a single 'version' directory
+    if 'segments' in manifest:
+        return [segment['name'] for segment in manifest['segments']]
+    return [manifest['version']]
+
+def _write_segment(path, arrays):
+    """
+    Returns:
+        dict: {"name", "rows"} of the new segment directory
+    """
+    existing = sorted(entry for entry in os.listdir(path) if entry.startswith('v'))
+    name = f"v{int(existing[-1][1:]) + 1:06d}" if existing else 'v000001'
+    segment_dir = os.path.join(path, name)
+    os.makedirs(segment_dir)
+    for column, array in arrays.items():
+        np.save(os.path.join(segment_dir, f"{column}.npy"), array)
+    return {'name': name, 'rows': len(arrays['game_id'])}
+
+def _write_manifest(path, through_date, segments):
+    manifest_path = os.path.join(path, MANIFEST)
+    previous = []
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            previous = _segment_names(json.load(f))
+
+    manifest = {
+        'through_date': through_date.isoformat(),
+        'version': segments[-1]['name'],  # Newest segment
+        'segments': segments,
+        'rows': sum(segment['rows'] for segment in segments),
+        'columns': COLUMNS
+    }
+    tmp_manifest = f"{manifest_path}.tmp"
+    with open(tmp_manifest, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_manifest, manifest_path)
+
+    # Workers may still map the segments of the previous manifest until they
+    # see the new one; any other segment is no longer referenced
+    keep = set(previous) | {segment['name'] for segment in segments}
+    for entry in os.listdir(path):
+        if entry.startswith('v') and entry not in keep:
+            shutil.rmtree(os.path.join(path, entry), ignore_errors=True)
+    return manifest
+
+def _sorted(arrays):
+    # Stable: players keep the order the query returned them in
+    order = np.lexsort((arrays['team_id'], arrays['game_id']))
+    return {name: array[order] for name, array in arrays.items()}
+
+def build_store(path, until=None, bind=None):
+    """
+    Replace the store with one segment holding the stats of every game
+    played before until (also merges the segments written by updates)
+    Args:
+        path (str): Store directory (created if missing)
+        until (date): Exclusive bound, today by default (games of today may not be final)
+    Returns:
+        dict: The new manifest
+    """
+    until = until or date.today()
+    os.makedirs(path, exist_ok=True)
+    segment = _write_segment(path, _sorted(_fetch_columns(date.min, until, bind)))
+    return _write_manifest(path, until, [segment])
+
+def append_games(path, until=None, bind=None):
+    """
+    Add the games played since the last build/update as a new segment.
+    Existing segments are not read nor rewritten
+    Returns:
+        dict: The new manifest (the current one if there was nothing to add)
+    """
+    until = until or date.today()
+    with open(os.path.join(path, MANIFEST)) as f:
+        manifest = json.load(f)
+    since = date.fromisoformat(manifest['through_date'])
+    if until <= since:
+        return manifest
+
+    segments = manifest.get('segments') or [{'name': manifest['version'], 'rows': manifest['rows']}]
+    new = _fetch_columns(since, until, bind)
+    if len(new['game_id']):
+        segments = segments + [_write_segment(path, _sorted(new))]
+    # No new game: only the watermark moves
+    return _write_manifest(path, until, segments)
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or update the player stats columnar store")
+    parser.add_argument('command', choices=('build', 'update'))
+    parser.add_argument('path', help="Store directory")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if args.command == 'build':
+        manifest = build_store(args.path)
+    else:
+        manifest = append_games(args.path)
+    print(f"{len(manifest['segments'])} segments, {manifest['rows']} rows through {manifest['through_date']} "
+          f"({time.perf_counter() - started:.1f}s)")
+
+if __name__ == '__main__':
+    main()
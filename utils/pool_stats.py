@@ -0,0 +1,133 @@
+import threading
+import time
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool
+
+# Upper bounds (ms) of the checkout wait histogram buckets
+WAIT_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+
+class PoolStats:
+    """
+    Counters of the engine's connection pool, fed by pool events and
+    InstrumentedQueuePool
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.checkins = 0
+            self.in_use = 0
+            self.peak_in_use = 0
+            self.connects = 0
+            self.invalidations = 0
+            self.timeouts = 0
+            self.wait_count = 0
+            self.wait_total = 0.0
+            self.wait_max = 0.0
+            self.wait_buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+
+    def record_wait(self, seconds):
+        elapsed_ms = seconds * 1000
+        with self._lock:
+            self.wait_count += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            for i, bound in enumerate(WAIT_BUCKETS_MS):
+                if elapsed_ms <= bound:
+                    self.wait_buckets[i] += 1
+                    break
+            else:
+                self.wait_buckets[-1] += 1
+
+    def record_timeout(self, seconds):
+        with self._lock:
+            self.timeouts += 1
+        self.record_wait(seconds)
+
+    def on_connect(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.connects += 1
+
+    def on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+
+    def on_checkin(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.checkins += 1
+            self.in_use = max(self.in_use - 1, 0)
+
+    def on_invalidate(self, dbapi_connection, connection_record, exception):
+        with self._lock:
+            self.invalidations += 1
+
+    def snapshot(self, pool=None):
+        """
+        Returns:
+            dict: Current counters, plus the live pool status when given
+        """
+        with self._lock:
+            data = {
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "in_use": self.in_use,
+                "peak_in_use": self.peak_in_use,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "timeouts": self.timeouts,
+                "checkout_wait": {
+                    "count": self.wait_count,
+                    "avg_ms": round(self.wait_total / self.wait_count * 1000, 3) if self.wait_count else 0.0,
+                    "max_ms": round(self.wait_max * 1000, 3),
+                    "buckets_ms": {
+                        **{str(bound): count for bound, count in zip(WAIT_BUCKETS_MS, self.wait_buckets)},
+                        "+Inf": self.wait_buckets[-1]
+                    }
+                }
+            }
+
+        if isinstance(pool, QueuePool):
+            data["pool"] = {
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": max(pool.overflow(), 0),
+                "max_overflow": pool._max_overflow,
+                "timeout": pool.timeout()
+            }
+        return data
+
+pool_stats = PoolStats()
+
+class InstrumentedQueuePool(QueuePool):
+    """
+    QueuePool that measures how long a checkout waits for a connection
+    (including opening a new one when the pool grows). Pool events only fire
+    once a connection is handed out, so the wait and the timeouts are taken
+    around the pool's own getter
+    """
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            pool_stats.record_timeout(time.perf_counter() - start)
+            raise
+        pool_stats.record_wait(time.perf_counter() - start)
+        return connection
+
+def install_pool_events(engine):
+    """
+    Register the pool event listeners that feed pool_stats
+    """
+    event.listen(engine, "connect", pool_stats.on_connect)
+    event.listen(engine, "checkout", pool_stats.on_checkout)
+    event.listen(engine, "checkin", pool_stats.on_checkin)
+    event.listen(engine, "invalidate", pool_stats.on_invalidate)
@@ -0,0 +1,73 @@
+import gc
+import logging
+from db import get_engine
+from utils.sql_loader import list_queries
+from utils.swagger_loader import load_docs
+from utils.name_index import name_resolver
+from utils.player_stats_store import player_stats_store
+from utils.snapshot import snapshot_engine
+from utils.health import health_checker
+
+logger = logging.getLogger(__name__)
+
+def preload_shared_state(app):
+    """
+    Build the read-only state every worker needs once, in the master process
+    before it forks, so the workers share it copy-on-write: the named query
+    registry, the parsed Swagger spec, the trade tool name index and the
+    player stats store mappings
+    Args:
+        app (Flask): Application created by create_app
+    """
+    list_queries()
+
+    swagger = app.extensions.get('swagger')
+    if swagger is not None:
+        load_docs()
+        # Flasgger keeps the generated /apispec.json outside debug mode
+        with app.test_request_context():
+            swagger.get_apispecs('apispec')
+
+    try:
+        name_resolver.refresh()
+    except Exception as e:
+        # Workers build it on the first trade instead
+        logger.warning("Name index not preloaded: %s", e)
+
+    player_stats_store()
+
+    # The master keeps no connections: each worker opens its own
+    get_engine().dispose()
+    # Objects created so far are never collected, so the collector does not
+    # write to (and copy) their pages in the workers
+    gc.freeze()
+
+def warm_up_worker(app):
+    """
+    Per-worker warm-up, run after the fork and before the worker accepts
+    requests: drop connections inherited from the master and fill the pool
+    Args:
+        app (Flask): Application created by create_app
+    """
+    # Sockets opened by the master belong to it, never close them from here
+    engine = get_engine()
+    engine.dispose(close=False)
+
+    connections = []
+    try:
+        for _ in range(engine.pool.size()):
+            connections.append(engine.connect())
+        snapshot = snapshot_engine()
+        if snapshot is not None:
+            snapshot.connect().close()
+    except Exception as e:
+        # The pool fills on demand; the worker still starts
+        logger.warning("Worker warm-up failed: %s", e)
+    finally:
+        for connection in connections:
+            connection.close()
+
+    logger.info("Worker warmed up with %s connections", len(connections))
+
+    # First readiness check before the worker takes traffic, then in the background
+    health_checker.start(wait=True)
@@ -0,0 +1,244 @@
+"""
+Plan audit of every named query in scripts/sql.
+
+Each query runs under EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) with sample
+parameters taken from the target database, inside a transaction that is
+rolled back (UPDATE/INSERT queries really execute under ANALYZE). The report
+lists, per query: cost, planning and execution time, buffers, sequential
+scans and the worst estimated vs actual row count.
+
+Usage:
+    python -m utils.query_audit
+    python -m utils.query_audit --query get_total_date_info --max-cost 1000 --max-time-ms 50
+    python -m utils.query_audit --database-url postgresql://... --param game_date=2025-06-05 --json
+
+Exits with 1 when a query goes over a budget (--max-cost, --max-time-ms,
+--max-seq-scan-rows).
+"""
+import argparse
+import json
+import sys
+from datetime import date, datetime
+from sqlalchemy import create_engine, text
+from utils.sql_loader import list_queries, get_named_query
+
+EXPLAIN_PREFIX = "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) "
+
+# Where sample values come from: (query, param) first, then param name alone.
+# Each SQL returns the value in its first column (every row for IN lists)
+SAMPLE_PARAMS = {
+    'game_id': "SELECT id FROM nba.dim_games ORDER BY game_date DESC, id LIMIT 1",
+    'game_ids': "SELECT id FROM nba.dim_games ORDER BY game_date DESC, id LIMIT 10",
+    'team_id': "SELECT home_team_id FROM nba.dim_games ORDER BY game_date DESC, id LIMIT 1",
+    'game_date': "SELECT DATE(max(game_date)) FROM nba.dim_games",
+    'start_date': "SELECT DATE(max(game_date)) - 7 FROM nba.dim_games",
+    'end_date': "SELECT DATE(max(game_date)) + 1 FROM nba.dim_games",
+    'player_id': "SELECT id FROM nba.dim_players ORDER BY id LIMIT 1",
+    'player_ids': "SELECT id FROM nba.dim_players ORDER BY id LIMIT 10",
+    'old_team_id': "SELECT team_id FROM nba.dim_players ORDER BY id LIMIT 1",
+    'new_team_id': "SELECT id FROM nba.dim_teams ORDER BY id DESC LIMIT 1",
+    'email': "SELECT email FROM nba.dim_users ORDER BY id LIMIT 1",
+    'password_hash': "SELECT password_hash FROM nba.dim_users ORDER BY id LIMIT 1",
+}
+
+# Used when a parameter has no sample query (or it returned nothing)
+DEFAULT_VALUES = {
+    'int': 1,
+    'float': 1.0,
+    'str': 'a',
+    'bool': True,
+    'date': date.today(),
+    'datetime': datetime.now(),
+}
+
+def _convert(value, type_name):
+    if type_name == 'int':
+        return int(value)
+    if type_name == 'float':
+        return float(value)
+    if type_name == 'bool':
+        return str(value).lower() in ('1', 'true', 'yes')
+    if type_name == 'date' and isinstance(value, str):
+        return date.fromisoformat(value)
+    if type_name == 'datetime' and isinstance(value, str):
+        return datetime.fromisoformat(value)
+    return value
+
+def sample_params(conn, query, overrides=None):
+    """
+    Representative values for the binds of a query
+    Args:
+        conn: Connection to the target database
+        query (NamedQuery): Query to sample parameters for
+        overrides (dict): param name -> value (str) given on the command line
+    Returns:
+        dict: Bound parameters
+    """
+    overrides = overrides or {}
+    params = {}
+    for name, (type_name, is_list) in query.params.items():
+        if name in overrides:
+            values = overrides[name].split(',') if is_list else [overrides[name]]
+        else:
+            sql = SAMPLE_PARAMS.get((query.name, name)) or SAMPLE_PARAMS.get(name)
+            values = [row[0] for row in conn.execute(text(sql))] if sql else []
+            values = [value for value in values if value is not None]
+            if not values:
+                values = [DEFAULT_VALUES[type_name]]
+        values = [_convert(value, type_name) for value in values]
+        params[name] = values if is_list else values[0]
+    return params
+
+# ====================================
+# PLAN ANALYSIS
+# ====================================
+def _walk(node):
+    yield node
+    for child in node.get('Plans', ()):
+        yield from _walk(child)
+
+def summarize_plan(explain):
+    """
+    Args:
+        explain (list): Output of EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON)
+    Returns:
+        dict: cost, timings, buffers, sequential scans and worst row estimate
+    """
+    root = explain[0]
+    plan = root['Plan']
+    seq_scans = []
+    worst = None
+
+    for node in _walk(plan):
+        loops = node.get('Actual Loops', 1) or 1
+        if node['Node Type'] == 'Seq Scan':
+            seq_scans.append({
+                'relation': f"{node.get('Schema', '')}.{node.get('Relation Name', '')}".lstrip('.'),
+                'rows_read': int((node.get('Actual Rows', 0) + node.get('Rows Removed by Filter', 0)) * loops),
+                'filter': node.get('Filter'),
+            })
+
+        # Never executed nodes (loops 0) say nothing about the estimate
+        if node.get('Actual Loops', 0) == 0:
+            continue
+        estimated = max(node['Plan Rows'], 1)
+        actual = max(node['Actual Rows'], 1)
+        factor = max(estimated / actual, actual / estimated)
+        if worst is None or factor > worst['factor']:
+            worst = {
+                'node': node['Node Type'],
+                'relation': node.get('Relation Name'),
+                'estimated_rows': node['Plan Rows'],
+                'actual_rows': node['Actual Rows'],
+                'factor': round(factor, 1),
+            }
+
+    return {
+        'total_cost': plan['Total Cost'],
+        'planning_ms': round(root.get('Planning Time', 0.0), 3),
+        'execution_ms': round(root.get('Execution Time', 0.0), 3),
+        'actual_rows': plan.get('Actual Rows'),
+        'shared_hit_blocks': plan.get('Shared Hit Blocks', 0),
+        'shared_read_blocks': plan.get('Shared Read Blocks', 0),
+        'seq_scans': seq_scans,
+        'worst_estimate': worst,
+    }
+
+def audit_query(engine, query, overrides=None):
+    """
+    EXPLAIN ANALYZE one named query in a transaction that is always rolled back
+    Returns:
+        dict: Parameters used and summarize_plan() of the plan
+    """
+    statement = text(EXPLAIN_PREFIX + query.sql).bindparams(*query.bind_params())
+    with engine.connect() as conn:
+        transaction = conn.begin()
+        try:
+            params = sample_params(conn, query, overrides)
+            explain = conn.execute(statement, params).scalar()
+        finally:
+            transaction.rollback()
+
+    if isinstance(explain, str):
+        explain = json.loads(explain)
+    return {'query': query.name, 'params': params, **summarize_plan(explain)}
+
+def check_budget(result, max_cost=None, max_time_ms=None, max_seq_scan_rows=None):
+    """
+    Returns:
+        list: Budgets the query went over, as messages
+    """
+    violations = []
+    if max_cost is not None and result['total_cost'] > max_cost:
+        violations.append(f"cost {result['total_cost']} > {max_cost}")
+    if max_time_ms is not None and result['execution_ms'] > max_time_ms:
+        violations.append(f"execution {result['execution_ms']} ms > {max_time_ms} ms")
+    if max_seq_scan_rows is not None:
+        for scan in result['seq_scans']:
+            if scan['rows_read'] > max_seq_scan_rows:
+                violations.append(f"seq scan on {scan['relation']} read {scan['rows_read']} rows > {max_seq_scan_rows}")
+    return violations
+
+def _print_report(results):
+    for result in results:
+        status = 'OVER BUDGET' if result['violations'] else 'ok'
+        print(f"{result['query']}  [{status}]")
+        print(f"  cost {result['total_cost']}  planning {result['planning_ms']} ms  "
+              f"execution {result['execution_ms']} ms  rows {result['actual_rows']}  "
+              f"buffers hit {result['shared_hit_blocks']} read {result['shared_read_blocks']}")
+        for scan in result['seq_scans']:
+            print(f"  seq scan {scan['relation']}: {scan['rows_read']} rows read"
+                  + (f" (filter: {scan['filter']})" if scan['filter'] else ""))
+        worst = result['worst_estimate']
+        if worst and worst['factor'] > 1:
+            print(f"  worst estimate: {worst['node']}"
+                  + (f" on {worst['relation']}" if worst['relation'] else "")
+                  + f" estimated {worst['estimated_rows']} vs actual {worst['actual_rows']} rows (x{worst['factor']})")
+        for violation in result['violations']:
+            print(f"  budget: {violation}")
+
+def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN ANALYZE every named query in scripts/sql")
+    parser.add_argument('--database-url', help="Target PostgreSQL database (db.py settings by default)")
+    parser.add_argument('--query', action='append', help="Only this query (repeatable)")
+    parser.add_argument('--param', action='append', default=[], metavar='NAME=VALUE',
+                        help="Value for a parameter, comma separated for IN lists (repeatable)")
+    parser.add_argument('--max-cost', type=float, help="Fail if a plan's total cost is higher")
+    parser.add_argument('--max-time-ms', type=float, help="Fail if a query takes longer to execute")
+    parser.add_argument('--max-seq-scan-rows', type=int, help="Fail if a sequential scan reads more rows")
+    parser.add_argument('--json', action='store_true', help="Print the results as JSON")
+    args = parser.parse_args()
+
+    overrides = {}
+    for item in args.param:
+        name, separator, value = item.partition('=')
+        if not separator:
+            parser.error(f"--param expects NAME=VALUE, got {item}")
+        overrides[name] = value
+
+    if args.database_url:
+        engine = create_engine(args.database_url)
+    else:
+        from db import engine
+    if engine.dialect.name != 'postgresql':
+        parser.error(f"The audit needs PostgreSQL, not {engine.dialect.name}")
+
+    queries = [get_named_query(name) for name in args.query] if args.query else list_queries()
+    results = []
+    for query in queries:
+        result = audit_query(engine, query, overrides)
+        result['violations'] = check_budget(result, args.max_cost, args.max_time_ms, args.max_seq_scan_rows)
+        results.append(result)
+
+    if args.json:
+        print(json.dumps(results, indent=2, default=str))
+    else:
+        _print_report(results)
+
+    over_budget = [result['query'] for result in results if result['violations']]
+    if over_budget:
+        print(f"{len(over_budget)} queries over budget: {', '.join(over_budget)}", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
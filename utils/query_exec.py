@@ -0,0 +1,68 @@
+from decimal import Decimal
+from db import get_engine
+from utils.sql_loader import get_statement, cached_result
+
+def _coerce(value):
+    # Same as pd.read_sql(coerce_float=True): NUMERIC columns come back as float
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+def _to_dict(row):
+    return {key: _coerce(value) for key, value in row._mapping.items()}
+
+def _fetch_all(query_name, params, bind):
+    with bind.connect() as conn:
+        result = conn.execute(get_statement(query_name), params)
+        return [_to_dict(row) for row in result]
+
+def all_mappings(query_name, params=None, bind=None):
+    """
+    Run a named query and return every row as a dict
+    Args:
+        query_name (str): Name of the query (from -- name: comment)
+        params (dict): Bound parameters
+        bind: Engine to run it on, the db engine by default
+    Returns:
+        list: One dict per row. Results of queries with a -- ttl: may come
+              from the result cache and are shared, do not modify them
+    """
+    params = params or {}
+    bind = bind or get_engine()
+    return cached_result(query_name, params, lambda: _fetch_all(query_name, params, bind))
+
+def one(query_name, params=None, bind=None):
+    """
+    Run a named query and return its first row
+    Returns:
+        dict or None: First row, None if the query returned no rows
+    """
+    rows = all_mappings(query_name, params, bind)
+    return rows[0] if rows else None
+
+def scalar(query_name, params=None, bind=None):
+    """
+    Run a named query and return the first column of its first row
+    Returns:
+        Value of the first column, None if the query returned no rows
+    """
+    row = one(query_name, params, bind)
+    return next(iter(row.values())) if row else None
+
+def iter_rows(query_name, params=None, bind=None, yield_per=None):
+    """
+    Run a named query and yield its rows as dicts without materializing them
+    Args:
+        yield_per (int): Rows fetched per round trip. When set, the query runs
+                         on a server-side cursor
+    Yields:
+        dict: One row at a time (never cached)
+    """
+    params = params or {}
+    bind = bind or get_engine()
+    with bind.connect() as conn:
+        if yield_per:
+            conn = conn.execution_options(stream_results=True, yield_per=yield_per)
+        result = conn.execute(get_statement(query_name), params)
+        for row in result:
+            yield _to_dict(row)
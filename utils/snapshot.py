@@ -0,0 +1,197 @@
+"""
+Read-only SQLite snapshot of the tables behind /api/stats.
+
+The export copies the read-side nba tables (and games_with_best_performers,
+materialized as a table) from the primary database into one SQLite file. With
+STATS_SNAPSHOT_PATH set, the stats blueprint reads that file instead of the
+primary: the file is attached as schema "nba", so the named queries in
+scripts/sql run unchanged.
+
+Usage:
+    python -m utils.snapshot nba_snapshot.db
+"""
+import argparse
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+from urllib.parse import quote
+from sqlalchemy import Column, Index, MetaData, Table, create_engine, select
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.types import Float, Numeric, String
+from utils.sql_loader import invalidate_tables
+
+# Tables (or views) copied into the snapshot, and the indexes built on them
+SNAPSHOT_TABLES = (
+    'dim_teams',
+    'dim_players',
+    'dim_games',
+    'fact_player_game_stats',
+    'games_with_best_performers',
+)
+SNAPSHOT_INDEXES = {
+    'dim_games': (('game_date',),),
+    'fact_player_game_stats': (('game_id', 'team_id'),),
+    'games_with_best_performers': (('game_id',), ('game_date',)),
+}
+SOURCE_SCHEMA = 'nba'
+EXPORT_BATCH_SIZE = 5000
+
+# ====================================
+# EXPORT
+# ====================================
+def _snapshot_type(column_type):
+    try:
+        generic = column_type.as_generic()
+    except NotImplementedError:
+        return String()
+    # NUMERIC is read back as float by the app anyway (utils/query_exec)
+    if isinstance(generic, Numeric):
+        return Float()
+    return generic
+
+def _snapshot_value(value):
+    return float(value) if isinstance(value, Decimal) else value
+
+def _copy_table(source_conn, target_conn, name):
+    source = Table(name, MetaData(), schema=SOURCE_SCHEMA, autoload_with=source_conn)
+    target = Table(
+        name,
+        MetaData(),
+        *(Column(column.name, _snapshot_type(column.type), primary_key=column.primary_key)
+          for column in source.columns)
+    )
+    for columns in SNAPSHOT_INDEXES.get(name, ()):
+        Index(f"{name}_{'_'.join(columns)}", *(target.c[column] for column in columns))
+    target.create(target_conn)
+
+    rows = 0
+    result = source_conn.execution_options(stream_results=True, yield_per=EXPORT_BATCH_SIZE).execute(select(source))
+    for batch in result.partitions():
+        target_conn.execute(target.insert(), [
+            {key: _snapshot_value(value) for key, value in row._mapping.items()}
+            for row in batch
+        ])
+        rows += len(batch)
+    return rows
+
+def export_snapshot(source_engine, path):
+    """
+    Copy the read-side nba tables into a SQLite file. The file is written next
+    to path and moved into place at the end, so readers never see a partial one
+    Args:
+        source_engine: Engine of the primary database
+        path (str): Destination SQLite file
+    Returns:
+        dict: Rows copied per table
+    """
+    path = os.path.abspath(path)
+    tmp_path = f"{path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    target_engine = create_engine(f"sqlite:///{tmp_path}")
+    counts = {}
+    try:
+        # One REPEATABLE READ transaction: every table from the same point in time
+        with source_engine.connect().execution_options(isolation_level="REPEATABLE READ") as source_conn, \
+                target_engine.begin() as target_conn:
+            for name in SNAPSHOT_TABLES:
+                counts[name] = _copy_table(source_conn, target_conn, name)
+            target_conn.exec_driver_sql("CREATE TABLE snapshot_info (exported_at TEXT NOT NULL)")
+            target_conn.exec_driver_sql(
+                "INSERT INTO snapshot_info VALUES (?)", (datetime.now(timezone.utc).isoformat(),)
+            )
+        with target_engine.connect() as target_conn:
+            target_conn.exec_driver_sql("ANALYZE")
+    finally:
+        target_engine.dispose()
+
+    os.replace(tmp_path, path)
+    return counts
+
+# ====================================
+# READ-ONLY ENGINE
+# ====================================
+def create_snapshot_engine(path):
+    """
+    Engine over a snapshot file. Every connection opens the file read-only and
+    attaches it as schema "nba"
+    Raises:
+        FileNotFoundError: If the snapshot does not exist
+    """
+    path = os.path.abspath(path)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Stats snapshot not found: {path}")
+    uri = f"file:{quote(path)}?mode=ro"
+
+    def connect():
+        conn = sqlite3.connect(':memory:', uri=True, check_same_thread=False)
+        conn.execute("ATTACH DATABASE ? AS nba", (uri,))
+        return conn
+
+    return create_engine("sqlite://", creator=connect, poolclass=QueuePool)
+
+class SnapshotStore:
+    """
+    Snapshot engine that follows the file: when a new export replaces it, the
+    next checkout (at most CHECK_INTERVAL seconds later) opens the new one and
+    cached results of the snapshot tables are dropped
+    """
+
+    CHECK_INTERVAL = 1.0
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._last_check = time.monotonic()
+        self._mtime = os.path.getmtime(path) if os.path.exists(path) else None
+        self._engine = create_snapshot_engine(path)
+
+    def engine(self):
+        if time.monotonic() - self._last_check > self.CHECK_INTERVAL:
+            with self._lock:
+                self._last_check = time.monotonic()
+                mtime = os.path.getmtime(self.path)
+                if mtime != self._mtime:
+                    old_engine, self._engine = self._engine, create_snapshot_engine(self.path)
+                    self._mtime = mtime
+                    # Connections in use keep the old file until they are returned
+                    old_engine.dispose()
+                    invalidate_tables(*(f"{SOURCE_SCHEMA}.{name}" for name in SNAPSHOT_TABLES))
+        return self._engine
+
+_store = None
+
+def configure_snapshot(path):
+    """
+    Apply the STATS_SNAPSHOT_PATH setting of the active config
+    Args:
+        path (str): Snapshot file, None or empty to read from the primary
+    """
+    global _store
+    _store = SnapshotStore(path) if path else None
+
+def snapshot_engine():
+    """
+    Returns:
+        Engine of the stats snapshot, None when snapshot mode is off
+    """
+    return _store.engine() if _store is not None else None
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the read-side nba tables into a SQLite snapshot")
+    parser.add_argument('path', help="Destination file (replaced atomically)")
+    args = parser.parse_args()
+
+    from db import engine
+    started = time.perf_counter()
+    counts = export_snapshot(engine, args.path)
+    for name, rows in counts.items():
+        print(f"nba.{name}: {rows} rows")
+    print(f"Snapshot written to {os.path.abspath(args.path)} in {time.perf_counter() - started:.1f}s")
+
+if __name__ == '__main__':
+    main()
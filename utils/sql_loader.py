@@ -1,8 +1,221 @@
 import os
 import re
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy import text, bindparam
+from sqlalchemy.types import Integer, Float, String, Boolean, Date, DateTime
 
-# Cache for loaded queries
-_queries_cache = {}
+SQL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts', 'sql')
+
+# Types accepted in -- params: and -- columns: annotations (name:type, name:type[] for IN lists)
+PARAM_TYPES = {
+    'int': Integer,
+    'float': Float,
+    'str': String,
+    'bool': Boolean,
+    'date': Date,
+    'datetime': DateTime,
+}
+
+_NAME_PATTERN = re.compile(r'^--\s*name:\s*(\w+)\s*$', re.MULTILINE)
+_META_PATTERN = re.compile(r'^--\s*(tables|ttl|params|columns):\s*(.*?)\s*$', re.MULTILINE)
+# Same rule TextClause uses to find :binds (skips ::casts and \: escapes)
+_BIND_PATTERN = re.compile(r'(?<![:\w\\]):(\w+)(?!:)')
+
+class NamedQuery:
+    """
+    A query from scripts/sql with its annotations and a ready-to-run statement
+    """
+
+    def __init__(self, name, sql, source, tables=(), ttl=None, params=None, columns=None):
+        self.name = name
+        self.sql = sql
+        self.source = source
+        self.tables = tables
+        self.ttl = ttl
+        self.params = params or {}    # name -> (type name, is_list)
+        self.columns = columns or {}  # result column -> (type name, is_list)
+        self.statement = self._compile()
+
+    def bind_params(self):
+        """
+        Returns:
+            list: Typed bindparam of every -- params: entry
+        """
+        return [
+            bindparam(name, type_=PARAM_TYPES[type_name](), expanding=is_list)
+            for name, (type_name, is_list) in self.params.items()
+        ]
+
+    def _compile(self):
+        statement = text(self.sql).bindparams(*self.bind_params())
+        if self.columns:
+            # Typed result columns: drivers without native types (SQLite snapshot)
+            # return dates as text, the type converts them back
+            statement = statement.columns(**{
+                name: PARAM_TYPES[type_name]() for name, (type_name, _) in self.columns.items()
+            })
+        # query_name labels the statement in the cursor events (utils/instrumentation)
+        return statement.execution_options(query_name=self.name)
+
+    def __repr__(self):
+        return f"<NamedQuery {self.name} ({os.path.basename(self.source)})>"
+
+def _parse_params(value, name, source):
+    params = {}
+    for item in filter(None, (part.strip() for part in value.split(','))):
+        param, _, type_name = item.partition(':')
+        type_name = type_name.strip() or 'str'
+        is_list = type_name.endswith('[]')
+        type_name = type_name[:-2] if is_list else type_name
+        if type_name not in PARAM_TYPES:
+            raise ValueError(f"Query '{name}' ({source}): unknown type '{type_name}' for param '{param}'")
+        params[param.strip()] = (type_name, is_list)
+    return params
+
+def _parse_file(filepath):
+    """
+    Parse one .sql file into NamedQuery objects
+    Raises:
+        ValueError: If a query is empty or its binds do not match -- params:
+    """
+    with open(filepath, 'r', encoding='utf-8') as f:
+        content = f.read()
+
+    # Split by -- name: comments
+    parts = _NAME_PATTERN.split(content)
+    queries = []
+
+    # Process each name/query pair
+    for i in range(1, len(parts), 2):
+        name = parts[i].strip()
+        body = parts[i + 1]
+        meta = dict(_META_PATTERN.findall(body))
+
+        # Clean up the SQL
+        sql = _META_PATTERN.sub('', body).strip()
+        sql = re.sub(r';\s*$', '', sql).strip()  # Remove trailing semicolon
+
+        if not sql:
+            raise ValueError(f"Query '{name}' ({filepath}) is empty")
+
+        params = _parse_params(meta.get('params', ''), name, filepath)
+        binds = set(_BIND_PATTERN.findall(re.sub(r'--[^\n]*', '', sql)))
+        if binds != set(params):
+            raise ValueError(
+                f"Query '{name}' ({filepath}): binds {sorted(binds)} "
+                f"do not match -- params: {sorted(params)}"
+            )
+
+        queries.append(NamedQuery(
+            name,
+            sql,
+            filepath,
+            tables=tuple(t.strip() for t in meta.get('tables', '').split(',') if t.strip()),
+            ttl=int(meta['ttl']) if meta.get('ttl') else None,
+            params=params,
+            columns=_parse_params(meta.get('columns', ''), name, filepath)
+        ))
+
+    return queries
+
+def _sql_files(sql_dir):
+    return sorted(
+        os.path.join(sql_dir, filename)
+        for filename in os.listdir(sql_dir)
+        if filename.endswith('.sql')
+    )
+
+def _build_registry(sql_dir):
+    registry = {}
+    for filepath in _sql_files(sql_dir):
+        for query in _parse_file(filepath):
+            if query.name in registry:
+                raise ValueError(
+                    f"Duplicate query '{query.name}' in {filepath} "
+                    f"(already defined in {registry[query.name].source})"
+                )
+            registry[query.name] = query
+    return registry
+
+def _files_mtime(sql_dir):
+    return max((os.path.getmtime(path) for path in _sql_files(sql_dir)), default=0)
+
+# Registry of every named query, built once by load_queries()
+_registry = None
+_registry_lock = threading.Lock()
+_registry_mtime = 0
+_hot_reload = False
+_last_reload_check = 0.0
+
+def load_queries(sql_dir=SQL_DIR):
+    """
+    Parse every .sql file and (re)build the query registry
+    Returns:
+        dict: query name -> NamedQuery
+    Raises:
+        ValueError: On duplicate names, empty queries or undeclared binds
+    """
+    global _registry, _registry_mtime
+
+    with _registry_lock:
+        registry = _build_registry(sql_dir)
+        _registry_mtime = _files_mtime(sql_dir)
+        _registry = registry
+    return registry
+
+def configure_queries(hot_reload=None):
+    """
+    Apply the SQL_HOT_RELOAD setting of the active config
+    """
+    global _hot_reload
+
+    if hot_reload is not None:
+        _hot_reload = hot_reload
+
+def _get_registry():
+    global _last_reload_check
+
+    if _registry is None:
+        return load_queries()
+
+    # Development only: pick up edited .sql files, checked at most once a second
+    if _hot_reload and time.monotonic() - _last_reload_check > 1:
+        _last_reload_check = time.monotonic()
+        if _files_mtime(SQL_DIR) > _registry_mtime:
+            return load_queries()
+
+    return _registry
+
+def get_named_query(query_name):
+    """
+    Get a NamedQuery from the registry
+    Raises:
+        ValueError: If query not found
+    """
+    registry = _get_registry()
+    try:
+        return registry[query_name]
+    except KeyError:
+        raise ValueError(f"Query '{query_name}' not found. Available queries: {sorted(registry)}") from None
+
+def list_queries():
+    """
+    Returns:
+        list: Every NamedQuery, sorted by name
+    """
+    return [query for _, query in sorted(_get_registry().items())]
+
+def require_queries(*query_names):
+    """
+    Fail at import time if a module uses queries that do not exist
+    Raises:
+        ValueError: With every missing name
+    """
+    missing = [name for name in query_names if name not in _get_registry()]
+    if missing:
+        raise ValueError(f"Missing queries: {missing}")
 
 def get_query(query_name):
     """
@@ -14,41 +227,223 @@ def get_query(query_name):
     Raises:
         ValueError: If query not found
     """
-    # Return from cache if already loaded
-    if query_name in _queries_cache:
-        return _queries_cache[query_name]
-    
-    sql_dir = 'scripts/sql'
-    
-    # Search through all .sql files
-    for filename in os.listdir(sql_dir):
-        if not filename.endswith('.sql'):
-            continue
-            
-        filepath = os.path.join(sql_dir, filename)
-        
-        with open(filepath, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        # Split by -- name: comments
-        parts = re.split(r'--\s*name:\s*(\w+)', content)
-        
-        # Process each name/query pair
-        for i in range(1, len(parts), 2):
-            name = parts[i].strip()
-            sql = parts[i + 1].strip()
-            
-            # Clean up the SQL
-            sql = re.sub(r';\s*$', '', sql)  # Remove trailing semicolon
-            sql = sql.strip()
-            
-            if sql:
-                _queries_cache[name] = sql
-                
-                # Found the query we're looking for
-                if name == query_name:
-                    return sql
-    
-    # Query not found
-    available = list(_queries_cache.keys())
-    raise ValueError(f"Query '{query_name}' not found. Available queries: {available}")
\ No newline at end of file
+    return get_named_query(query_name).sql
+
+def get_statement(query_name):
+    """
+    Get the precompiled statement of a query, with typed binds
+    Args:
+        query_name (str): Name of the query (from -- name: comment)
+    Returns:
+        TextClause: Statement ready for conn.execute()
+    Raises:
+        ValueError: If query not found
+    """
+    return get_named_query(query_name).statement
+
+def get_query_tables(query_name):
+    """
+    Get the tables a query reads or writes (from -- tables: comment)
+    Args:
+        query_name (str): Name of the query
+    Returns:
+        tuple: Table names used as cache tags
+    """
+    return get_named_query(query_name).tables
+
+def get_query_ttl(query_name):
+    """
+    Get the result cache TTL of a query (from -- ttl: comment)
+    Args:
+        query_name (str): Name of the query
+    Returns:
+        int or None: Seconds a result may be cached, None if not cacheable
+    """
+    return get_named_query(query_name).ttl
+
+# ====================================
+# RESULT CACHE
+# ====================================
+class ResultCache:
+    """
+    Thread-safe LRU cache with a TTL per entry and table tags for invalidation
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, tags, value)
+        self._tag_keys = {}            # tag -> set of keys
+        self._tag_generations = {}     # tag -> invalidation counter
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Returns:
+            tuple: (hit, value)
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+
+            expires_at, _, value = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                return False, None
+
+            self._entries.move_to_end(key)
+            return True, value
+
+    def generation(self, tags):
+        """
+        Snapshot of the invalidation counters of some tags, taken before
+        running a query so a concurrent invalidation discards its result
+        """
+        with self._lock:
+            return tuple(self._tag_generations.get(tag, 0) for tag in tags)
+
+    def set(self, key, value, ttl, tags=(), generation=None):
+        with self._lock:
+            if generation is not None:
+                current = tuple(self._tag_generations.get(tag, 0) for tag in tags)
+                if current != generation:
+                    return
+
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (time.monotonic() + ttl, tags, value)
+            for tag in tags:
+                self._tag_keys.setdefault(tag, set()).add(key)
+
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, key):
+        """
+        Drop one entry
+        Returns:
+            bool: Whether the key was cached
+        """
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+                return True
+            return False
+
+    def invalidate_tags(self, tags):
+        """
+        Drop every entry tagged with any of the given tables
+        Returns:
+            int: Number of entries removed
+        """
+        removed = 0
+        with self._lock:
+            for tag in tags:
+                self._tag_generations[tag] = self._tag_generations.get(tag, 0) + 1
+                for key in list(self._tag_keys.get(tag, ())):
+                    self._remove(key)
+                    removed += 1
+        return removed
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tag_keys.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _remove(self, key):
+        _, tags, _ = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tag_keys.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tag_keys[tag]
+
+_result_cache = ResultCache()
+_result_cache_enabled = True
+
+def configure_result_cache(max_entries=None, enabled=None):
+    """
+    Apply the RESULT_CACHE_* settings of the active config
+    """
+    global _result_cache_enabled
+
+    if max_entries is not None:
+        _result_cache.max_entries = max_entries
+    if enabled is not None:
+        _result_cache_enabled = enabled
+        if not enabled:
+            _result_cache.clear()
+
+def _freeze(params):
+    # Lists (IN :ids parameters) are not hashable
+    return tuple(sorted(
+        (name, tuple(value) if isinstance(value, list) else value)
+        for name, value in (params or {}).items()
+    ))
+
+def cached_result(query_name, params, loader):
+    """
+    Return the cached result of a named query or run loader() and cache it
+    Args:
+        query_name (str): Name of the query, its -- ttl: decides if it is cached
+        params (dict): Bound parameters, part of the cache key
+        loader (callable): Runs the query when there is no valid entry
+    Returns:
+        Whatever loader() returns
+    """
+    ttl = get_query_ttl(query_name)
+    if not ttl or not _result_cache_enabled:
+        return loader()
+
+    key = (query_name, _freeze(params))
+    hit, value = _result_cache.get(key)
+    if hit:
+        return value
+
+    tags = get_query_tables(query_name)
+    generation = _result_cache.generation(tags)
+    value = loader()
+    _result_cache.set(key, value, ttl, tags, generation)
+    return value
+
+async def cached_result_async(query_name, params, loader):
+    """
+    cached_result for async callers
+    Args:
+        loader (callable): Coroutine function that runs the query
+    """
+    ttl = get_query_ttl(query_name)
+    if not ttl or not _result_cache_enabled:
+        return await loader()
+
+    key = (query_name, _freeze(params))
+    hit, value = _result_cache.get(key)
+    if hit:
+        return value
+
+    tags = get_query_tables(query_name)
+    generation = _result_cache.generation(tags)
+    value = await loader()
+    _result_cache.set(key, value, ttl, tags, generation)
+    return value
+
+def invalidate_tables(*tables):
+    """
+    Invalidate cached results of every query that reads the given tables
+    Returns:
+        int: Number of entries removed
+    """
+    return _result_cache.invalidate_tags(tables)
+
+def invalidate_query_tables(query_name):
+    """
+    Invalidate cached results affected by a write query (its -- tables:)
+    Returns:
+        int: Number of entries removed
+    """
+    return invalidate_tables(*get_query_tables(query_name))
@@ -1,30 +1,61 @@
-import yaml
+import os
+
+SWAGGER_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'swagger', 'global.yaml')
+
+# Parsed swagger/global.yaml, indexed by endpoint name (loaded once)
+_docs = None
+
+
+def load_docs():
+    """
+    Parse swagger/global.yaml the first time it is needed
+    Returns:
+        dict: endpoint name -> spec
+    """
+    global _docs
+
+    if _docs is None:
+        import yaml
+        loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+        with open(SWAGGER_FILE, 'r', encoding='utf-8') as f:
+            _docs = yaml.load(f, Loader=loader) or {}
+    return _docs
 
 def load_doc(name):
-    with open('swagger/global.yaml', 'r') as f:
-        docs = yaml.safe_load(f)
-    
-    if name not in docs:
-        return ""
-    
-    spec = docs[name]
-    
-    # Build Flask-RESTX docstring format
-    docstring = f"{spec.get('summary', '')}\n---\n"
-    
-    # Add each section
-    for key, value in spec.items():
-        if key != 'summary':
-            docstring += f"{key}:\n"
-            # Convert back to YAML format with proper indentation
-            yaml_str = yaml.dump(value, default_flow_style=False, indent=2)
-            indented = '\n'.join(['  ' + line for line in yaml_str.split('\n')])
-            docstring += indented + '\n'
-    
-    return docstring.strip()
+    """
+    Get the spec of one endpoint
+    Returns:
+        dict: Spec from global.yaml, empty if the name is not documented
+    """
+    return load_docs().get(name, {})
 
 def swagger_doc(name):
+    """
+    Tag the view with its global.yaml entry. The tag is copied by the
+    decorators that wrap the view (functools.wraps); the spec itself is only
+    attached by document_views, when the app enables Swagger
+    """
     def decorator(func):
-        func.__doc__ = load_doc(name)
+        func.swagger_doc_name = name
         return func
-    return decorator
\ No newline at end of file
+    return decorator
+
+def document_views(app):
+    """
+    Attach the global.yaml spec of every tagged view registered in the app
+    Args:
+        app (Flask): Application with its blueprints registered
+    """
+    for func in app.view_functions.values():
+        name = getattr(func, 'swagger_doc_name', None)
+        if name is None:
+            continue
+
+        spec = load_doc(name)
+        if spec:
+            # Flasgger reads the spec dict when /apispec.json is built,
+            # the docstring only keeps the summary line
+            func.specs_dict = spec
+            func.__doc__ = spec.get('summary', '')
+        else:
+            func.__doc__ = ""
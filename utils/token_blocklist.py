@@ -0,0 +1,137 @@
+import heapq
+import os
+import sqlite3
+import threading
+import time
+
+class TokenBlocklist:
+    """
+    Revoked JWTs by jti. The check on every @jwt_required request is a dict
+    lookup; entries are dropped once the token's exp has passed, because an
+    expired token is rejected anyway. Expired entries are popped from the
+    head of the heap on every revoke and lookup, so the memory backend stays
+    bounded by the tokens still valid
+    """
+
+    def __init__(self, store=None, sync_interval=1.0):
+        self.store = store
+        self.sync_interval = sync_interval
+        self._revoked = {}   # jti -> exp (epoch seconds)
+        self._expiry = []    # heap of (exp, jti)
+        self._lock = threading.Lock()
+        self._last_sync = 0.0
+        self._last_row = 0
+
+    def revoke(self, jti, exp):
+        """
+        Revoke a token until its expiration
+        Args:
+            jti (str): Token id (jti claim)
+            exp (int): Token expiration (exp claim)
+        """
+        self._purge(time.time())
+        self._add(jti, exp)
+        if self.store is not None:
+            self.store.add(jti, exp)
+
+    def is_revoked(self, jti):
+        now = time.time()
+        if self.store is not None and time.monotonic() - self._last_sync > self.sync_interval:
+            self._sync()
+        self._purge(now)
+
+        exp = self._revoked.get(jti)
+        return exp is not None and exp > now
+
+    def _add(self, jti, exp):
+        with self._lock:
+            if jti not in self._revoked:
+                heapq.heappush(self._expiry, (exp, jti))
+            self._revoked[jti] = exp
+
+    def _purge(self, now):
+        # Peek without the lock: it is only taken when the head has expired
+        try:
+            if self._expiry[0][0] > now:
+                return
+        except IndexError:
+            return
+        with self._lock:
+            while self._expiry and self._expiry[0][0] <= now:
+                _, jti = heapq.heappop(self._expiry)
+                self._revoked.pop(jti, None)
+
+    def _sync(self):
+        # Tokens revoked by other workers since the last sync
+        self._last_sync = time.monotonic()
+        now = time.time()
+        for row_id, jti, exp in self.store.since(self._last_row, now):
+            self._add(jti, exp)
+            self._last_row = max(self._last_row, row_id)
+        self._purge(now)
+
+    def __len__(self):
+        return len(self._revoked)
+
+class SQLiteTokenStore:
+    """
+    Revocations shared by every worker of the host through a SQLite file
+    """
+
+    CLEANUP_INTERVAL = 300  # Seconds between deletes of expired rows
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._last_cleanup = 0.0
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS revoked_tokens ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " jti TEXT NOT NULL UNIQUE,"
+            " exp REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS revoked_tokens_exp ON revoked_tokens (exp)")
+
+    def _connection(self):
+        # One connection per thread and per process (workers fork)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def add(self, jti, exp):
+        conn = self._connection()
+        conn.execute("INSERT OR IGNORE INTO revoked_tokens (jti, exp) VALUES (?, ?)", (jti, exp))
+
+        now = time.time()
+        if now - self._last_cleanup > self.CLEANUP_INTERVAL:
+            self._last_cleanup = now
+            conn.execute("DELETE FROM revoked_tokens WHERE exp < ?", (now,))
+
+    def since(self, row_id, now):
+        """
+        Returns:
+            list: (id, jti, exp) of unexpired revocations after row_id
+        """
+        return self._connection().execute(
+            "SELECT id, jti, exp FROM revoked_tokens WHERE id > ? AND exp > ? ORDER BY id",
+            (row_id, now)
+        ).fetchall()
+
+def create_blocklist(app_config):
+    """
+    Create the blocklist set in TOKEN_BLOCKLIST_BACKEND ('memory' or 'sqlite')
+    """
+    backend = app_config['TOKEN_BLOCKLIST_BACKEND']
+    if backend == 'memory':
+        return TokenBlocklist()
+    if backend == 'sqlite':
+        return TokenBlocklist(
+            SQLiteTokenStore(app_config['TOKEN_BLOCKLIST_SQLITE_PATH']),
+            sync_interval=app_config['TOKEN_BLOCKLIST_SYNC_INTERVAL']
+        )
+    raise ValueError(f"Unknown TOKEN_BLOCKLIST_BACKEND: {backend}")
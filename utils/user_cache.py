@@ -0,0 +1,58 @@
+from utils.sql_loader import ResultCache
+from utils.query_exec import one
+
+# Records of nba.dim_users by email, None for unknown emails (negative cache)
+_users = ResultCache(max_entries=10000)
+_ttl = 10
+_negative_ttl = 5
+
+def configure_user_cache(ttl=None, negative_ttl=None, max_entries=None):
+    """
+    Apply the USER_CACHE_* settings of the active config (TTL 0 disables it)
+    """
+    global _ttl, _negative_ttl
+
+    if ttl is not None:
+        _ttl = ttl
+    if negative_ttl is not None:
+        _negative_ttl = negative_ttl
+    if max_entries is not None:
+        _users.max_entries = max_entries
+    _users.clear()
+
+def get_user(email):
+    """
+    Get id, email, username and user_rol of a user
+    Args:
+        email (str): User email
+    Returns:
+        dict or None: User record (shared, do not modify), None if unknown
+    """
+    hit, user = _users.get(email)
+    if hit:
+        return user
+
+    generation = _users.generation(('nba.dim_users',))
+    user = one('get_user_by_email', {"email": email})
+    prime_user(email, user, generation)
+    return user
+
+def prime_user(email, user, generation=None):
+    """
+    Store a fresh record (e.g. the one login just read)
+    """
+    ttl = _ttl if user is not None else _negative_ttl
+    if ttl > 0:
+        _users.set(email, user, ttl, ('nba.dim_users',), generation)
+
+def invalidate_user(email):
+    """
+    Forget one user, call it after changing or deleting them
+    """
+    _users.invalidate(email)
+
+def invalidate_all_users():
+    """
+    Forget every user (e.g. after bulk changes to nba.dim_users)
+    """
+    _users.invalidate_tags(('nba.dim_users',))
@@ -0,0 +1,4 @@
+from app import create_app
+
+# Entry point for WSGI servers (gunicorn -c gunicorn.conf.py)
+app = create_app()